@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from apps.analytics.models import DailyDifficultyStat, DailyRangeStat, DailyScore
+from apps.analytics.utils import (
+    difficulty_counts,
+    invalidate_user_analytics,
+    range_counts,
+)
+from apps.exams.models import AnswerOutcome, ExamAttempt
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los agregados diarios de analíticas en SQL a partir de los "
+        "intentos y sus AnswerOutcome (correr antes backfill_answer_outcomes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Solo este usuario (id)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        attempts = ExamAttempt.objects.order_by()
+        outcomes = AnswerOutcome.objects.order_by()
+        if options["user"]:
+            attempts = attempts.filter(user_id=options["user"])
+            outcomes = outcomes.filter(user_id=options["user"])
+        # Mismo día local que usa record_attempt
+        attempts = attempts.annotate(date=TruncDate("completed_at"))
+        outcomes = outcomes.annotate(date=TruncDate("completed_at"))
+
+        sources = [
+            (
+                DailyScore,
+                attempts.values("user_id", "date").annotate(
+                    attempts=Count("id"),
+                    correct=Sum("score"),
+                    total=Sum("total_questions"),
+                ),
+            ),
+            (
+                DailyDifficultyStat,
+                difficulty_counts(outcomes, "user_id", "date"),
+            ),
+            (DailyRangeStat, range_counts(outcomes, "user_id", "date")),
+        ]
+
+        with transaction.atomic():
+            for model, rows in sources:
+                existing = model.objects.all()
+                if options["user"]:
+                    existing = existing.filter(user_id=options["user"])
+                existing.delete()
+                total = self.copy(model, rows, options["batch_size"])
+                self.stdout.write(f"{model.__name__}: {total} rows")
+
+        user_ids = attempts.values_list("user_id", flat=True).distinct()
+        for user_id in user_ids:
+            invalidate_user_analytics(user_id)
+
+    def copy(self, model, rows, batch_size):
+        total = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(model(**row))
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+        return total + len(batch)
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("documents", "0003_document_processing_progress"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyDifficultyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("difficulty", models.CharField(max_length=20)),
+                ("answered", models.IntegerField(default=0)),
+                ("correct", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "date", "difficulty"),
+                        name="unique_daily_difficulty_stat",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyRangeStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("page_start", models.IntegerField()),
+                ("page_end", models.IntegerField()),
+                ("answered", models.IntegerField(default=0)),
+                ("correct", models.IntegerField(default=0)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="documents.document",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "date", "document", "page_start", "page_end"),
+                        name="unique_daily_range_stat",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("attempts", models.IntegerField(default=0)),
+                ("correct", models.IntegerField(default=0)),
+                ("total", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "date"), name="unique_daily_score"
+                    )
+                ],
+            },
+        ),
+    ]
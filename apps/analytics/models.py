@@ -0,0 +1,66 @@
+"""
+Agregados diarios por usuario que se actualizan al registrar cada intento
+(``apps.analytics.utils.record_attempt``). Los endpoints de analíticas solo
+suman estas filas; nunca recorren ``ExamAttempt.answers``.
+"""
+
+from django.db import models
+
+from apps.documents.models import Document
+from apps.users.models import User
+
+
+class DailyScore(models.Model):
+    """Intentos y puntaje del usuario en un día"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    attempts = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="unique_daily_score"),
+        ]
+
+
+class DailyDifficultyStat(models.Model):
+    """Preguntas respondidas y acertadas en un día, por dificultad"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    difficulty = models.CharField(max_length=20)
+    answered = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "date", "difficulty"],
+                name="unique_daily_difficulty_stat",
+            ),
+        ]
+
+
+class DailyRangeStat(models.Model):
+    """
+    Preguntas respondidas y acertadas en un día, por documento y rango de
+    páginas del examen donde se generó cada pregunta.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="+")
+    page_start = models.IntegerField()
+    page_end = models.IntegerField()
+    answered = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "date", "document", "page_start", "page_end"],
+                name="unique_daily_range_stat",
+            ),
+        ]
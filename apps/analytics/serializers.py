@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(
+        min_value=1, max_value=settings.ANALYTICS_MAX_DAYS, default=30
+    )
+
+
+class ScoreTrendSerializer(serializers.Serializer):
+    """Puntaje de un día"""
+
+    date = serializers.DateField()
+    attempts = serializers.IntegerField()
+    correct = serializers.IntegerField()
+    total = serializers.IntegerField()
+    accuracy = serializers.FloatField(allow_null=True)
+
+
+class DifficultyAccuracySerializer(serializers.Serializer):
+    difficulty = serializers.ChoiceField(choices=["easy", "medium", "hard"])
+    answered = serializers.IntegerField()
+    correct = serializers.IntegerField()
+    accuracy = serializers.FloatField(allow_null=True)
+
+
+class RangeAccuracySerializer(serializers.Serializer):
+    document = serializers.IntegerField()
+    document_name = serializers.CharField()
+    page_start = serializers.IntegerField()
+    page_end = serializers.IntegerField()
+    answered = serializers.IntegerField()
+    correct = serializers.IntegerField()
+    accuracy = serializers.FloatField(allow_null=True)
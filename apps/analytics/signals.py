@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.dispatch import receiver
+
+from apps.analytics.utils import invalidate_user_analytics, record_attempt
+from apps.exams.signals import attempt_recorded
+
+
+@receiver(attempt_recorded)
+def update_daily_rollups(sender, attempt, **kwargs):
+    # Corre dentro de la transacción que crea el intento y sus AnswerOutcome
+    record_attempt(attempt)
+    transaction.on_commit(lambda: invalidate_user_analytics(attempt.user_id))
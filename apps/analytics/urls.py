@@ -0,0 +1,13 @@
+from django.urls import path
+
+from apps.analytics.views import (
+    DifficultyAccuracyView,
+    RangeAccuracyView,
+    ScoreTrendView,
+)
+
+urlpatterns = [
+    path("analytics/score-trend/", ScoreTrendView.as_view()),
+    path("analytics/difficulty/", DifficultyAccuracyView.as_view()),
+    path("analytics/documents/", RangeAccuracyView.as_view()),
+]
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.analytics.models import DailyDifficultyStat, DailyRangeStat, DailyScore
+from apps.exams.models import AnswerOutcome
+from apps.exams.utils import reverse_translate_difficulty
+from core.cache import TwoTierCache
+
+# Una entrada por endpoint y fecha de inicio; el grupo es el usuario
+analytics_cache = TwoTierCache("analytics", timeout=settings.ANALYTICS_CACHE_TIMEOUT)
+
+
+def _increment(model, counters, **key):
+    """
+    Suma ``counters`` ({campo: n}) a la fila de ``model`` identificada por
+    ``key``, creándola si no existe. Seguro ante intentos concurrentes del
+    mismo usuario: el INSERT ignora el conflicto y el UPDATE usa F().
+    """
+    model.objects.bulk_create([model(**key)], ignore_conflicts=True)
+    model.objects.filter(**key).update(
+        **{field: F(field) + value for field, value in counters.items()}
+    )
+
+
+def difficulty_counts(outcomes, *fields):
+    """``outcomes`` agrupados por ``fields`` y la dificultad de la pregunta"""
+    return outcomes.values(*fields, difficulty=F("question__difficulty")).annotate(
+        answered=Count("id"), correct=Count("id", filter=Q(is_correct=True))
+    )
+
+
+def range_counts(outcomes, *fields):
+    """
+    ``outcomes`` agrupados por ``fields`` y el documento/rango del examen de
+    origen de cada pregunta
+    """
+    return outcomes.values(
+        *fields,
+        document_id=F("question__exam__document_id"),
+        page_start=Coalesce("question__exam__page_start", 0),
+        page_end=Coalesce("question__exam__page_end", 0),
+    ).annotate(answered=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+
+
+def record_attempt(attempt):
+    """
+    Suma el intento a los agregados diarios del usuario, agrupando en SQL
+    sus ``AnswerOutcome`` por dificultad y por documento/rango de origen.
+    """
+    outcomes = AnswerOutcome.objects.filter(attempt_id=attempt.id).order_by()
+    date = timezone.localdate(attempt.completed_at)
+    key = {"user_id": attempt.user_id, "date": date}
+    with transaction.atomic():
+        _increment(
+            DailyScore,
+            {
+                "attempts": 1,
+                "correct": attempt.score,
+                "total": attempt.total_questions,
+            },
+            **key,
+        )
+        for row in difficulty_counts(outcomes):
+            _increment(
+                DailyDifficultyStat,
+                {"answered": row.pop("answered"), "correct": row.pop("correct")},
+                **key,
+                **row,
+            )
+        for row in range_counts(outcomes):
+            _increment(
+                DailyRangeStat,
+                {"answered": row.pop("answered"), "correct": row.pop("correct")},
+                **key,
+                **row,
+            )
+
+
+def invalidate_user_analytics(user_id):
+    analytics_cache.invalidate_group(user_id)
+
+
+def _since(days):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def _accuracy(correct, total):
+    return round(correct / total, 4) if total else None
+
+
+def get_score_trend(user_id, days):
+    """Puntaje por día de los últimos ``days`` días (solo días con intentos)"""
+
+    since = _since(days)
+
+    def load():
+        rows = DailyScore.objects.filter(user_id=user_id, date__gte=since).order_by(
+            "date"
+        )
+        return [
+            {
+                "date": row.date.isoformat(),
+                "attempts": row.attempts,
+                "correct": row.correct,
+                "total": row.total,
+                "accuracy": _accuracy(row.correct, row.total),
+            }
+            for row in rows
+        ]
+
+    return analytics_cache.get_or_set(f"trend:{since}", load, group=user_id)
+
+
+def get_difficulty_accuracy(user_id, days):
+    """Acierto por dificultad en los últimos ``days`` días"""
+
+    since = _since(days)
+
+    def load():
+        rows = (
+            DailyDifficultyStat.objects.filter(user_id=user_id, date__gte=since)
+            .values("difficulty")
+            .annotate(answered=Sum("answered"), correct=Sum("correct"))
+            .order_by("difficulty")
+        )
+        return [
+            {
+                "difficulty": reverse_translate_difficulty(row["difficulty"]),
+                "answered": row["answered"],
+                "correct": row["correct"],
+                "accuracy": _accuracy(row["correct"], row["answered"]),
+            }
+            for row in rows
+        ]
+
+    return analytics_cache.get_or_set(f"difficulty:{since}", load, group=user_id)
+
+
+def get_range_accuracy(user_id, days):
+    """Acierto por documento y rango de páginas en los últimos ``days`` días"""
+
+    since = _since(days)
+
+    def load():
+        rows = (
+            DailyRangeStat.objects.filter(user_id=user_id, date__gte=since)
+            .values("document_id", "document__name", "page_start", "page_end")
+            .annotate(answered=Sum("answered"), correct=Sum("correct"))
+            .order_by("document_id", "page_start", "page_end")
+        )
+        return [
+            {
+                "document": row["document_id"],
+                "document_name": row["document__name"],
+                "page_start": row["page_start"],
+                "page_end": row["page_end"],
+                "answered": row["answered"],
+                "correct": row["correct"],
+                "accuracy": _accuracy(row["correct"], row["answered"]),
+            }
+            for row in rows
+        ]
+
+    return analytics_cache.get_or_set(f"ranges:{since}", load, group=user_id)
@@ -0,0 +1,69 @@
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.analytics import serializers
+from apps.analytics.utils import (
+    get_difficulty_accuracy,
+    get_range_accuracy,
+    get_score_trend,
+)
+
+DAYS_PARAMETER = OpenApiParameter(
+    name="days",
+    type=int,
+    location=OpenApiParameter.QUERY,
+    description="Period in days, counting today (default 30)",
+)
+
+
+class AnalyticsView(APIView):
+    """Lee un agregado del usuario para los últimos ``days`` días"""
+
+    permission_classes = [IsAuthenticated]
+    loader = None
+
+    def get(self, request, *args, **kwargs):
+        query = serializers.AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(self.loader(request.user.id, query.validated_data["days"]))
+
+
+class ScoreTrendView(AnalyticsView):
+    loader = staticmethod(get_score_trend)
+
+    @extend_schema(
+        parameters=[DAYS_PARAMETER],
+        responses={200: serializers.ScoreTrendSerializer(many=True)},
+        description="Daily score of the authenticated user's attempts.",
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class DifficultyAccuracyView(AnalyticsView):
+    loader = staticmethod(get_difficulty_accuracy)
+
+    @extend_schema(
+        parameters=[DAYS_PARAMETER],
+        responses={200: serializers.DifficultyAccuracySerializer(many=True)},
+        description="Share of correctly answered questions by difficulty.",
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class RangeAccuracyView(AnalyticsView):
+    loader = staticmethod(get_range_accuracy)
+
+    @extend_schema(
+        parameters=[DAYS_PARAMETER],
+        responses={200: serializers.RangeAccuracySerializer(many=True)},
+        description=(
+            "Share of correctly answered questions by document and the page "
+            "range each question was generated from."
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
@@ -0,0 +1,112 @@
+"""
+Extracción de texto de PDFs por rangos de páginas en un pool de procesos.
+
+Este módulo no importa Django: los workers del pool solo cargan pypdf. El PDF
+se comparte por ruta en disco; cada worker abre el archivo y pypdf lee lo que
+necesita con seek, así nunca se envían los bytes del PDF por pickle.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Estado dentro de cada worker: el último PDF abierto
+_open_path = None
+_open_file = None
+_open_reader = None
+
+
+def _get_reader(path):
+    global _open_path, _open_file, _open_reader
+    if _open_path != path:
+        if _open_file is not None:
+            _open_file.close()
+        _open_file = open(path, "rb")
+        _open_reader = PdfReader(_open_file)
+        _open_path = path
+    return _open_reader
+
+
+def _page_text(reader, index):
+    native_text = reader.pages[index].extract_text() or ""
+    # Basic text cleaning: normalize whitespace
+    return " ".join(native_text.strip().split())
+
+
+def extract_page_range(path, start, end):
+    """
+    Extrae las páginas [start, end) (índices base 0) y retorna una lista de
+    ``(número de página, texto)``.
+    """
+    reader = _get_reader(path)
+    return [(index + 1, _page_text(reader, index)) for index in range(start, end)]
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(max_workers, start_method):
+    """Pool de procesos compartido por todos los hilos del proceso actual."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(start_method),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_page_chunks(path, num_pages, workers, chunk_size, start_method="spawn"):
+    """
+    Genera listas de ``(página, texto)`` por bloques de ``chunk_size`` páginas,
+    siempre en orden de página. Con más de un worker los bloques se extraen en
+    paralelo y se entregan en cuanto el bloque anterior está listo.
+    """
+    ranges = [
+        (start, min(start + chunk_size, num_pages))
+        for start in range(0, num_pages, chunk_size)
+    ]
+
+    if workers <= 1 or len(ranges) <= 1:
+        with open(path, "rb") as pdf_file:
+            reader = PdfReader(pdf_file)
+            for start, end in ranges:
+                yield [
+                    (index + 1, _page_text(reader, index))
+                    for index in range(start, end)
+                ]
+        return
+
+    pool = get_pool(workers, start_method)
+    futures = [
+        pool.submit(extract_page_range, path, start, end) for start, end in ranges
+    ]
+    try:
+        for future in futures:
+            yield future.result()
+    except BrokenProcessPool:
+        logger.error("PDF extraction pool broke, it will be rebuilt")
+        _discard_pool(pool)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.documents.utils import R2Storage, build_r2_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el costo por llamada de crear un cliente boto3 nuevo "
+        "contra reutilizar el cliente compartido de R2Storage"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--key",
+            help="Si se indica, cada iteración hace además un HEAD de este objeto",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        key = options["key"]
+
+        def per_call(fn):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            return (time.perf_counter() - start) / iterations * 1000
+
+        def fresh_client():
+            client = build_r2_client()
+            if key:
+                client.head_object(Bucket=R2Storage().bucket_name, Key=key)
+
+        def shared_client():
+            storage = R2Storage()
+            if key:
+                storage.head_file(key)
+
+        # Primera llamada fuera de la medición: carga de modelos de botocore
+        shared_client()
+
+        before = per_call(fresh_client)
+        after = per_call(shared_client)
+
+        self.stdout.write(
+            f"iterations: {iterations}" + (f", HEAD {key}" if key else "")
+        )
+        self.stdout.write(f"new client per call: {before:.2f} ms/call")
+        self.stdout.write(f"shared client:       {after:.2f} ms/call")
+        if after:
+            self.stdout.write(f"speedup:             {before / after:.1f}x")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0001_initial"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["hash_md5"], name="documents_d_hash_md_c67614_idx"
+            ),
+        ),
+    ]
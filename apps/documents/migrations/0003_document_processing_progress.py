@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:39
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_extracted_documents_done(apps, schema_editor):
+    # Documentos anteriores a esta migración con bloques ya fueron procesados
+    Document = apps.get_model("documents", "Document")
+    Block = apps.get_model("documents", "Block")
+    Document.objects.filter(
+        Exists(Block.objects.filter(document=OuterRef("pk")))
+    ).update(status="done", pages_done=models.F("num_pages"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0002_document_hash_md5_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="last_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="pages_done",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pendiente"),
+                    ("processing", "Procesando"),
+                    ("done", "Listo"),
+                    ("failed", "Fallido"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(mark_extracted_documents_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-16 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0003_document_processing_progress"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["user", "created_at", "id"],
+                name="documents_d_user_id_b76ab2_idx",
+            ),
+        ),
+    ]
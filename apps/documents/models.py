@@ -4,6 +4,11 @@ from apps.users.models import User
 
 
 class Document(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
     url = models.TextField(max_length=250)
     name = models.TextField(max_length=250)
     size = models.IntegerField()
@@ -12,11 +17,34 @@ class Document(models.Model):
     hash_md5 = models.TextField(max_length=32)
     num_pages = models.IntegerField()
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDING, "Pendiente"),
+            (STATUS_PROCESSING, "Procesando"),
+            (STATUS_DONE, "Listo"),
+            (STATUS_FAILED, "Fallido"),
+        ],
+        default=STATUS_PENDING,
+    )
+    pages_done = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
     created_at = models.DateField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.name}"
 
+    def pages_available(self, page_end):
+        """True si las páginas hasta page_end ya fueron extraídas"""
+        return self.status == self.STATUS_DONE or page_end <= self.pages_done
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["hash_md5"]),
+            # Llave de la paginación por cursor del listado
+            models.Index(fields=["user", "created_at", "id"]),
+        ]
+
 
 class Block(models.Model):
     content = models.TextField()
@@ -7,6 +7,7 @@ class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = "__all__"
+        read_only_fields = ["status", "pages_done", "last_error"]
 
 
 class BlockSerializer(serializers.ModelSerializer):
@@ -17,3 +18,31 @@ class BlockSerializer(serializers.ModelSerializer):
 
 class DocumentUploadSerializer(serializers.Serializer):
     file = serializers.FileField(required=True)
+
+
+class PresignedUploadRequestSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(default="application/pdf")
+
+
+class PresignedUploadPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1)
+    url = serializers.URLField(required=False)
+    etag = serializers.CharField(required=False)
+
+
+class PresignedUploadSerializer(serializers.Serializer):
+    """Response with the presigned URL(s) for a direct upload to R2"""
+
+    upload_token = serializers.CharField()
+    key = serializers.CharField()
+    url = serializers.URLField(required=False)
+    upload_id = serializers.CharField(required=False)
+    part_size = serializers.IntegerField(required=False)
+    parts = PresignedUploadPartSerializer(many=True, required=False)
+
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    upload_token = serializers.CharField()
+    parts = PresignedUploadPartSerializer(many=True, required=False)
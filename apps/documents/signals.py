@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.documents.models import Document
+from apps.documents.utils import document_cache, page_text_cache
+from core.response_cache import invalidate_user_responses
+
+
+@receiver(post_save, sender=Document)
+def invalidate_document_cache(sender, instance, **kwargs):
+    document_cache.delete(instance.id)
+    invalidate_user_responses(instance.user_id)
+
+
+@receiver(post_delete, sender=Document)
+def invalidate_deleted_document(sender, instance, **kwargs):
+    document_cache.delete(instance.id)
+    page_text_cache.invalidate_group(instance.id)
+    invalidate_user_responses(instance.user_id)
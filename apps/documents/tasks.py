@@ -1,59 +1,177 @@
-import io
 import logging
-from huey.contrib.djhuey import db_task
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from huey import crontab
+from huey.contrib.djhuey import db_periodic_task, db_task
 from pypdf import PdfReader
+from apps.documents.extraction import iter_page_chunks
 from apps.documents.models import Document, Block
-from apps.documents.utils import R2Storage
+from apps.documents.utils import (
+    R2Storage,
+    clone_document_blocks,
+    document_cache,
+    find_duplicate_document,
+    get_pdf_metadata,
+    page_text_cache,
+)
+from apps.exams.tasks import schedule_question_bank
+from apps.exams.utils import copy_question_bank
+from core.response_cache import invalidate_user_responses
+from core.websocket import notify_user
 
 logger = logging.getLogger(__name__)
 
 
+def _update_progress(document, **fields):
+    """
+    Actualiza el progreso sin pisar el resto de columnas del documento y lo
+    empuja por WebSocket al dueño. Como update() no dispara ``post_save``,
+    aquí mismo se descarta la metadata cacheada (``get_document_metadata``),
+    que incluye status y pages_done, junto con las respuestas HTTP cacheadas
+    del dueño: quien consulta el documento por polling (en vez de por
+    WebSocket) ve avanzar pages_done con un ETag nuevo en cada lote.
+    """
+    for name, value in fields.items():
+        setattr(document, name, value)
+    Document.objects.filter(id=document.id).update(**fields)
+    document_cache.delete(document.id)
+    invalidate_user_responses(document.user_id)
+    notify_user(
+        document.user_id,
+        "document.progress",
+        {
+            "document_id": document.id,
+            "status": document.status,
+            "pages_done": document.pages_done,
+            "num_pages": document.num_pages,
+            "last_error": document.last_error,
+        },
+    )
+
+
+def _reuse_extracted_text(document):
+    """
+    Si otro documento con el mismo hash ya fue extraído, copia sus bloques
+    y evita descargar y procesar el PDF de nuevo.
+    """
+    source = find_duplicate_document(
+        document.hash_md5, processed=True, exclude_id=document.id
+    )
+    if source is None:
+        return None
+
+    Block.objects.filter(document=document).delete()
+    pages = clone_document_blocks(source, document)
+    page_text_cache.invalidate_group(document.id)
+    # Las subidas directas llegan sin num_pages: se toma del original, o el
+    # documento quedaría sin páginas (y sin ventanas de banco) para siempre
+    fields = {"num_pages": source.num_pages}
+    if not document.size:
+        fields["size"] = source.size
+    _update_progress(
+        document,
+        status=Document.STATUS_DONE,
+        pages_done=source.pages_done,
+        **fields,
+    )
+    # Mismo texto, mismo banco: se copia y solo se encolan las ventanas que
+    # al original todavía le falten
+    copy_question_bank(source, document)
+    schedule_question_bank(document)
+    logger.info(
+        "Reused %d pages from document %s for document %s",
+        pages,
+        source.id,
+        document.id,
+    )
+    return {
+        "status": "success",
+        "document_id": str(document.id),
+        "message": "Text reused from an identical document",
+        "pages_processed": pages,
+        "source_document_id": str(source.id),
+    }
+
+
 @db_task()
 def process_pdf(document_id):
     """
     Task to extract text from a PDF document and save it as Blocks.
+    Blocks are committed in batches as pages are extracted, so exams can be
+    created for the first pages while the rest of the document is processed.
     """
-    print("Starting PDF text extraction for document: %s", document_id)
     logger.info("Starting PDF text extraction for document: %s", document_id)
+
+    # 1. Fetch document from database
     try:
-        # 1. Fetch document from database
-        try:
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            logger.error("Document not found: %s", document_id)
-            return {"status": "error", "message": "Document not found"}
-
-        # 2. Download file from R2
+        document = Document.objects.get(id=document_id)
+    except Document.DoesNotExist:
+        logger.error("Document not found: %s", document_id)
+        return {"status": "error", "message": "Document not found"}
+
+    try:
+        _update_progress(
+            document, status=Document.STATUS_PROCESSING, pages_done=0, last_error=""
+        )
+
+        result = _reuse_extracted_text(document)
+        if result is not None:
+            return result
+
+        # 2. Download file from R2 into a temp file (not into memory)
         storage = R2Storage()
-        # Use the r2_key which contains the path in the bucket
-        pdf_data = storage.download_file(document.r2_key)
-
-        # 3. Extract text using pypdf
-        reader = PdfReader(io.BytesIO(pdf_data))
-        total_pages = len(reader.pages)
-        logger.info("Processing %d pages for document: %s", total_pages, document.name)
-
-        blocks_to_create = []
-        for i in range(total_pages):
-            page_number = i + 1
-            native_text = reader.pages[i].extract_text() or ""
-
-            # Basic text cleaning: normalize whitespace
-            content = " ".join(native_text.strip().split())
-
-            blocks_to_create.append(
-                Block(
-                    content=content,
-                    page=page_number,
-                    document=document,
-                    user=document.user,
-                )
+        # NamedTemporaryFile: los workers de extracción abren el PDF por ruta
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            # Use the r2_key which contains the path in the bucket
+            storage.download_file(document.r2_key, pdf_file)
+
+            # Direct uploads arrive without hash/page count
+            if not document.hash_md5 or not document.num_pages:
+                metadata = get_pdf_metadata(pdf_file)
+                document.hash_md5 = metadata["hash_md5"]
+                document.num_pages = metadata["num_pages"]
+                document.save(update_fields=["hash_md5", "num_pages"])
+
+                result = _reuse_extracted_text(document)
+                if result is not None:
+                    return result
+
+            pdf_file.flush()
+            total_pages = len(PdfReader(pdf_file).pages)
+            logger.info(
+                "Processing %d pages for document: %s", total_pages, document.name
             )
-            logger.debug("Page %d: Text extracted (native)", page_number)
 
-        # 4. Save blocks to database in bulk
-        if blocks_to_create:
-            Block.objects.bulk_create(blocks_to_create)
+            # Un reintento empieza desde cero
+            Block.objects.filter(document=document).delete()
+
+            # 3. Extract text using pypdf, page ranges in parallel processes,
+            # and save each batch of blocks as soon as it is ready
+            for pages in iter_page_chunks(
+                pdf_file.name,
+                total_pages,
+                workers=settings.PDF_EXTRACTION_WORKERS,
+                chunk_size=settings.PDF_EXTRACTION_CHUNK_SIZE,
+                start_method=settings.PDF_EXTRACTION_START_METHOD,
+            ):
+                Block.objects.bulk_create(
+                    [
+                        Block(
+                            content=content,
+                            page=page_number,
+                            document=document,
+                            user_id=document.user_id,
+                        )
+                        for page_number, content in pages
+                    ]
+                )
+                _update_progress(document, pages_done=pages[-1][0])
+                page_text_cache.invalidate_group(document.id)
+                logger.debug("Pages %d-%d: Text extracted", pages[0][0], pages[-1][0])
+
+        _update_progress(document, status=Document.STATUS_DONE)
+        schedule_question_bank(document)
 
         logger.info("PDF text extraction completed for document: %s", document_id)
         return {
@@ -65,5 +183,21 @@ def process_pdf(document_id):
 
     except Exception as exc:
         logger.error("Error extracting text from PDF %s: %s", document_id, exc)
-        # Re-raise to let Celery handle retries if configured
+        _update_progress(document, status=Document.STATUS_FAILED, last_error=str(exc))
+        # Re-raise to let Huey handle retries if configured
         raise
+
+
+@db_periodic_task(crontab(minute="30"))
+def abort_stale_uploads():
+    """
+    Aborta las subidas multipart presignadas que nunca se finalizaron: una
+    vez vencido el upload_token ya no se pueden completar y R2 cobra sus
+    partes mientras existan.
+    """
+    aborted = R2Storage().abort_stale_multipart_uploads(
+        "pdfs/", timedelta(seconds=settings.R2_PRESIGNED_URL_EXPIRES)
+    )
+    if aborted:
+        logger.info("Aborted %d stale multipart uploads", aborted)
+    return {"status": "success", "aborted": aborted}
@@ -1,3 +1,225 @@
-from django.test import TestCase
+import io
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import requests
+from django.test import TestCase, override_settings
+from pypdf import PdfWriter
+from rest_framework.test import APIClient
+
+from apps.documents import utils
+from apps.documents.models import Document
+from apps.users.models import User
+
+try:
+    from moto.server import ThreadedMotoServer
+except ImportError:  # moto solo se instala en desarrollo
+    ThreadedMotoServer = None
+
+S3_PORT = 5055
+S3_ENDPOINT = f"http://127.0.0.1:{S3_PORT}"
+PART_SIZE = 5 * 1024 * 1024  # mínimo de S3 para partes no finales
+
+
+def make_pdf(pages=2, padding=0):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue() + b"\0" * padding
+
+
+@unittest.skipIf(ThreadedMotoServer is None, "moto is not installed")
+@override_settings(
+    R2_ACCOUNT_ID="test",
+    R2_ACCESS_KEY_ID="test",
+    R2_SECRET_ACCESS_KEY="test",
+    R2_BUCKET_NAME="pdfs",
+    R2_PUBLIC_URL="https://files.test",
+    R2_ENDPOINT_URL=S3_ENDPOINT,
+    R2_MULTIPART_THRESHOLD=PART_SIZE,
+    R2_MULTIPART_CHUNKSIZE=PART_SIZE,
+)
+class DirectUploadTests(TestCase):
+    """Presign + finalize contra un S3 local (moto en modo servidor)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadedMotoServer(port=S3_PORT)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        utils._reset_r2_client()
+        self.addCleanup(utils._reset_r2_client)
+        self.s3 = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT,
+            region_name="us-east-1",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+        )
+        self.s3.create_bucket(Bucket="pdfs")
+
+        patcher = mock.patch("apps.documents.views.process_pdf")
+        self.process_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create(clerk_id="user_upload", email="a@b.c")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def presign(self, data, name="notes.pdf"):
+        response = self.client.post(
+            "/api/documents/upload/presign/",
+            {"name": name, "size": len(data)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def finalize(self, upload_token, parts=None):
+        body = {"upload_token": upload_token}
+        if parts is not None:
+            body["parts"] = parts
+        return self.client.post("/api/documents/upload/finalize/", body, format="json")
+
+    def upload_parts(self, presigned, data):
+        parts = []
+        for part in presigned["parts"]:
+            number = part["part_number"]
+            chunk = data[(number - 1) * presigned["part_size"] :][
+                : presigned["part_size"]
+            ]
+            response = requests.put(part["url"], data=chunk)
+            self.assertEqual(response.status_code, 200)
+            parts.append({"part_number": number, "etag": response.headers["ETag"]})
+        return parts
+
+    def test_single_put_upload(self):
+        data = make_pdf()
+        presigned = self.presign(data)
+        response = requests.put(
+            presigned["url"], data=data, headers={"Content-Type": "application/pdf"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.finalize(presigned["upload_token"])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        document = Document.objects.get(id=response.data["data"]["id"])
+        self.assertEqual(document.r2_key, presigned["key"])
+        self.assertEqual(document.size, len(data))
+        self.process_pdf.assert_called_once_with(document.id)
+
+    def test_multipart_upload(self):
+        data = make_pdf(padding=PART_SIZE + 1024)
+        presigned = self.presign(data)
+        self.assertEqual(len(presigned["parts"]), 2)
+        parts = self.upload_parts(presigned, data)
+
+        response = self.finalize(presigned["upload_token"], parts)
+
+        self.assertEqual(response.status_code, 201, response.data)
+        head = self.s3.head_object(Bucket="pdfs", Key=presigned["key"])
+        self.assertEqual(head["ContentLength"], len(data))
+
+    def test_finalize_is_repeatable(self):
+        data = make_pdf(padding=PART_SIZE + 1024)
+        presigned = self.presign(data)
+        parts = self.upload_parts(presigned, data)
+
+        first = self.finalize(presigned["upload_token"], parts)
+        retry = self.finalize(presigned["upload_token"], parts)
+
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual(retry.status_code, 200, retry.data)
+        self.assertEqual(retry.data["data"]["id"], first.data["data"]["id"])
+        self.assertEqual(Document.objects.filter(user=self.user).count(), 1)
+        self.process_pdf.assert_called_once()
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_duplicate_upload_reuses_stored_object(self):
+        data = make_pdf()
+        keys, ids = [], []
+        for _ in range(2):
+            presigned = self.presign(data)
+            requests.put(
+                presigned["url"], data=data, headers={"Content-Type": "application/pdf"}
+            )
+            response = self.finalize(presigned["upload_token"])
+            self.assertEqual(response.status_code, 201, response.data)
+            keys.append(presigned["key"])
+            ids.append(response.data["data"]["id"])
+
+        retry = self.finalize(presigned["upload_token"])
+
+        self.assertEqual(retry.status_code, 200, retry.data)
+        self.assertEqual(retry.data["data"]["id"], ids[1])
+        self.assertEqual(Document.objects.get(id=ids[1]).r2_key, keys[0])
+        objects = self.s3.list_objects_v2(Bucket="pdfs").get("Contents", [])
+        self.assertEqual([obj["Key"] for obj in objects], [keys[0]])
+
+    def test_failed_multipart_completion_aborts_upload(self):
+        data = make_pdf(padding=PART_SIZE + 1024)
+        presigned = self.presign(data)
+        parts = self.upload_parts(presigned, data)
+        parts[0]["etag"] = '"0000"'
+
+        response = self.finalize(presigned["upload_token"], parts)
+
+        self.assertEqual(response.status_code, 400)
+        uploads = self.s3.list_multipart_uploads(Bucket="pdfs")
+        self.assertEqual(uploads.get("Uploads", []), [])
+        self.assertFalse(Document.objects.exists())
+
+    def test_abort_stale_multipart_uploads(self):
+        data = make_pdf(padding=PART_SIZE + 1024)
+        presigned = self.presign(data)
+        self.upload_parts(presigned, data)
+        storage = utils.R2Storage()
+        # El reloj se fija respecto al Initiated que reporta el servidor (moto
+        # usa una fecha fija), no a la hora real
+        initiated = self.s3.list_multipart_uploads(Bucket="pdfs")["Uploads"][0][
+            "Initiated"
+        ]
+
+        with mock.patch(
+            "django.utils.timezone.now", return_value=initiated + timedelta(minutes=1)
+        ):
+            kept = storage.abort_stale_multipart_uploads("pdfs/", timedelta(hours=1))
+            uploads = self.s3.list_multipart_uploads(Bucket="pdfs")
+            self.assertEqual((kept, len(uploads.get("Uploads", []))), (0, 1))
+
+            aborted = storage.abort_stale_multipart_uploads("pdfs/", timedelta(0))
+
+        self.assertEqual(aborted, 1)
+        uploads = self.s3.list_multipart_uploads(Bucket="pdfs")
+        self.assertEqual(uploads.get("Uploads", []), [])
+
+    def test_finalize_without_uploaded_object(self):
+        presigned = self.presign(make_pdf())
+
+        response = self.finalize(presigned["upload_token"])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Document.objects.exists())
+
+    def test_finalize_rejects_foreign_token(self):
+        presigned = self.presign(make_pdf())
+        other = User.objects.create(clerk_id="someone_else")
+        self.client.force_authenticate(other)
+
+        response = self.finalize(presigned["upload_token"])
+
+        self.assertEqual(response.status_code, 400)
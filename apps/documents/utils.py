@@ -1,11 +1,85 @@
 import hashlib
-from typing import Dict, Any
-from io import BytesIO
+import math
+import os
+import threading
+import uuid
+from datetime import timedelta
+from typing import BinaryIO, Dict, Any, List, Optional
 from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
 from pypdf import PdfReader
 
+from apps.documents.models import Block, Document
+from apps.documents.serializers import DocumentSerializer
+from core.cache import TwoTierCache
+
+document_cache = TwoTierCache("document")
+# Agrupado por documento: al (re)extraer un documento se invalidan todos sus rangos
+page_text_cache = TwoTierCache("page_text")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+_r2_client = None
+_r2_client_pid = None
+_r2_client_lock = threading.Lock()
+
+
+def build_r2_client():
+    """
+    Creates an S3 client configured for R2 (R2_ENDPOINT_URL allows a local
+    S3 stand-in). Prefer get_r2_client(); building a client is slow.
+    """
+    # Session propia: la sesión por defecto de boto3 no es segura entre hilos
+    session = boto3.session.Session()
+    return session.client(
+        "s3",
+        endpoint_url=settings.R2_ENDPOINT_URL
+        or f"https://{settings.R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
+        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.R2_CONNECT_TIMEOUT,
+            read_timeout=settings.R2_READ_TIMEOUT,
+            retries={"max_attempts": settings.R2_MAX_ATTEMPTS, "mode": "standard"},
+            tcp_keepalive=True,
+        ),
+        region_name="auto",
+    )
+
+
+def get_r2_client():
+    """
+    Returns the process-wide R2 client, building it lazily. boto3 clients are
+    thread-safe; after a fork the child builds its own so sockets are never
+    shared between processes.
+    """
+    global _r2_client, _r2_client_pid
+    pid = os.getpid()
+    if _r2_client is None or _r2_client_pid != pid:
+        with _r2_client_lock:
+            if _r2_client is None or _r2_client_pid != pid:
+                _r2_client = build_r2_client()
+                _r2_client_pid = pid
+    return _r2_client
+
+
+def _reset_r2_client():
+    global _r2_client, _r2_client_lock
+    _r2_client = None
+    _r2_client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_r2_client)
+
 
 class R2Storage:
     """
@@ -32,32 +106,41 @@ class R2Storage:
                 "R2_SECRET_ACCESS_KEY, and R2_BUCKET_NAME."
             )
 
-        # Create S3 client configured for R2
-        self.client = boto3.client(
-            "s3",
-            endpoint_url=f"https://{self.account_id}.r2.cloudflarestorage.com",
-            aws_access_key_id=self.access_key_id,
-            aws_secret_access_key=self.secret_access_key,
-            config=Config(signature_version="s3v4"),
-            region_name="auto",
+        # Shared per-process S3 client (connection pool reused across calls)
+        self.client = get_r2_client()
+
+        # Multipart upload: partes de R2_MULTIPART_CHUNKSIZE enviadas en paralelo,
+        # así la memoria por subida queda acotada sin importar el tamaño
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.R2_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.R2_MULTIPART_CHUNKSIZE,
+            max_concurrency=settings.R2_MULTIPART_CONCURRENCY,
+            use_threads=True,
         )
 
-    def upload_file(
-        self, file_content: bytes, file_name: str, content_type: str
-    ) -> str:
+    @staticmethod
+    def build_key(file_name: str) -> str:
+        return f"pdfs/{uuid.uuid4()}_{file_name}"
+
+    def upload_file(self, file_obj: BinaryIO, file_name: str, content_type: str) -> str:
         """
-        Uploads a file to R2 Storage and returns the public URL.
+        Streams a file object to R2 Storage and returns the public URL.
         """
         path = f"pdfs/{file_name}"
 
         # Upload to R2
-        self.client.put_object(
-            Bucket=self.bucket_name,
-            Key=path,
-            Body=file_content,
-            ContentType=content_type,
+        file_obj.seek(0)
+        self.client.upload_fileobj(
+            file_obj,
+            self.bucket_name,
+            path,
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
         )
 
+        return self.get_public_url(path)
+
+    def get_public_url(self, path: str) -> str:
         # Return public URL
         if self.public_url:
             return f"{self.public_url}/{path}"
@@ -65,21 +148,196 @@ class R2Storage:
             # Fallback to R2.dev URL
             return f"https://{self.bucket_name}.{self.account_id}.r2.cloudflarestorage.com/{path}"
 
-    def download_file(self, path: str) -> bytes:
+    def create_presigned_upload(
+        self, path: str, content_type: str, expires_in: int
+    ) -> str:
+        """
+        Returns a presigned URL the client can PUT the whole file to.
+        The PUT must send the same Content-Type header.
+        """
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": path,
+                "ContentType": content_type,
+            },
+            ExpiresIn=expires_in,
+        )
+
+    def create_presigned_multipart_upload(
+        self, path: str, content_type: str, size: int, expires_in: int
+    ) -> Dict[str, Any]:
+        """
+        Starts a multipart upload and returns one presigned URL per part.
+        The client PUTs each part and sends back the ETags to complete it.
+        """
+        upload = self.client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=path, ContentType=content_type
+        )
+        part_size = settings.R2_MULTIPART_CHUNKSIZE
+        part_count = max(1, math.ceil(size / part_size))
+
+        parts = [
+            {
+                "part_number": part_number,
+                "url": self.client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": self.bucket_name,
+                        "Key": path,
+                        "UploadId": upload["UploadId"],
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=expires_in,
+                ),
+            }
+            for part_number in range(1, part_count + 1)
+        ]
+        return {"upload_id": upload["UploadId"], "part_size": part_size, "parts": parts}
+
+    def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=path,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part["part_number"], "ETag": part["etag"]}
+                    for part in sorted(parts, key=lambda p: p["part_number"])
+                ]
+            },
+        )
+
+    def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        self.client.abort_multipart_upload(
+            Bucket=self.bucket_name, Key=path, UploadId=upload_id
+        )
+
+    def abort_stale_multipart_uploads(self, prefix: str, older_than: timedelta) -> int:
+        """
+        Aborts multipart uploads under ``prefix`` started more than
+        ``older_than`` ago (presigned uploads that were never finalized).
+        Returns how many were aborted.
+        """
+        cutoff = timezone.now() - older_than
+        aborted = 0
+        paginator = self.client.get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for upload in page.get("Uploads", []):
+                if upload["Initiated"] > cutoff:
+                    continue
+                self.abort_multipart_upload(upload["Key"], upload["UploadId"])
+                aborted += 1
+        return aborted
+
+    def head_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the object metadata, or None if it does not exist.
+        """
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=path)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def delete_file(self, path: str) -> None:
+        self.client.delete_object(Bucket=self.bucket_name, Key=path)
+
+    def download_file(self, path: str, file_obj: BinaryIO) -> BinaryIO:
         """
-        Downloads a file from R2 Storage.
+        Streams a file from R2 Storage into ``file_obj`` and rewinds it.
         """
-        response = self.client.get_object(Bucket=self.bucket_name, Key=path)
-        return response["Body"].read()
+        self.client.download_fileobj(
+            self.bucket_name, path, file_obj, Config=self.transfer_config
+        )
+        file_obj.seek(0)
+        return file_obj
 
 
-def get_pdf_metadata(file_content: bytes) -> Dict[str, Any]:
+def get_pdf_metadata(file_obj: BinaryIO) -> Dict[str, Any]:
     """
-    Extracts number of pages and MD5 hash from PDF content.
+    Extracts number of pages and MD5 hash from a PDF file object.
+    The hash is computed in chunks so the file is never fully loaded in memory.
     """
-    reader = PdfReader(BytesIO(file_content))
+    hash_md5 = hashlib.md5()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+        hash_md5.update(chunk)
+
+    file_obj.seek(0)
+    reader = PdfReader(file_obj)
     num_pages = len(reader.pages)
+    file_obj.seek(0)
+
+    return {"num_pages": num_pages, "hash_md5": hash_md5.hexdigest()}
+
+
+def get_document_metadata(document_id):
+    """
+    Retorna el documento serializado (DocumentSerializer) o None si no existe.
+    """
 
-    hash_md5 = hashlib.md5(file_content).hexdigest()
+    def load():
+        document = Document.objects.filter(id=document_id).first()
+        if document is None:
+            return None
+        return dict(DocumentSerializer(document).data)
 
-    return {"num_pages": num_pages, "hash_md5": hash_md5}
+    return document_cache.get_or_set(document_id, load)
+
+
+def get_page_range_text(document_id, page_start, page_end):
+    """
+    Retorna el texto de las páginas [page_start, page_end] tal como se le
+    envía al LLM, o None si no hay bloques en ese rango.
+    """
+
+    def load():
+        blocks = (
+            Block.objects.filter(
+                document=document_id, page__gte=page_start, page__lte=page_end
+            )
+            .order_by("page")
+            .values_list("page", "content")
+        )
+        if not blocks:
+            return None
+        return "\n\n".join([f"Página {page}: {content}" for page, content in blocks])
+
+    return page_text_cache.get_or_set(
+        f"{page_start}-{page_end}", load, group=document_id
+    )
+
+
+def find_duplicate_document(hash_md5, processed=False, exclude_id=None):
+    """
+    Busca un documento con el mismo contenido (hash_md5). Con ``processed``
+    solo considera documentos cuyo texto ya fue extraído.
+    """
+    if not hash_md5:
+        return None
+    documents = Document.objects.filter(hash_md5=hash_md5)
+    if processed:
+        documents = documents.filter(status=Document.STATUS_DONE)
+    if exclude_id is not None:
+        documents = documents.exclude(id=exclude_id)
+    return documents.order_by("id").first()
+
+
+def clone_document_blocks(source, target):
+    """
+    Copia los bloques de ``source`` a ``target`` con un solo INSERT ... SELECT,
+    sin traer el texto a Python. Retorna el número de bloques copiados.
+    """
+    table = connection.ops.quote_name(Block._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (content, page, document_id, user_id, created_at) "
+            f"SELECT content, page, %s, %s, %s FROM {table} WHERE document_id = %s",
+            [target.id, target.user_id, timezone.localdate(), source.id],
+        )
+        return cursor.rowcount
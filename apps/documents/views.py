@@ -1,4 +1,7 @@
 import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
@@ -6,10 +9,17 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from drf_spectacular.utils import extend_schema
 from apps.documents.models import Document
 from apps.documents import serializers
-from apps.documents.utils import R2Storage, get_pdf_metadata
+from apps.documents.utils import (
+    R2Storage,
+    find_duplicate_document,
+    get_pdf_metadata,
+)
 from apps.documents.tasks import process_pdf
 from sentry_sdk import logger as sentry_logger
 
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+UPLOAD_TOKEN_SALT = "documents.direct-upload"
+
 
 class DocumentUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
@@ -41,7 +51,7 @@ class DocumentUploadView(APIView):
         )
 
         # 1. Validation (already partially done by serializer, but keeping explicit checks)
-        if file_obj.size > 50 * 1024 * 1024:
+        if file_obj.size > MAX_UPLOAD_SIZE:
             return Response(
                 {"error": "File size exceeds 50MB limit."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -57,22 +67,33 @@ class DocumentUploadView(APIView):
             )
 
         try:
-            file_content = file_obj.read()
-            metadata = get_pdf_metadata(file_content)
+            # El archivo ya está en disco (TemporaryFileUploadHandler); se lee
+            # por bloques para el hash y se sube a R2 en partes
+            metadata = get_pdf_metadata(file_obj)
             sentry_logger.info(f"📤 [UPLOAD] PDF has {metadata['num_pages']} pages")
 
-            storage = R2Storage()
-            storage_filename = f"{uuid.uuid4()}_{file_obj.name}"
-            public_url = storage.upload_file(
-                file_content, storage_filename, file_obj.content_type
-            )
+            # Mismo contenido ya subido: se reutiliza el objeto en R2
+            duplicate = find_duplicate_document(metadata["hash_md5"])
+            if duplicate is not None:
+                sentry_logger.info(
+                    f"📤 [UPLOAD] Reusing stored object of document {duplicate.id}"
+                )
+                public_url = duplicate.url
+                r2_key = duplicate.r2_key
+            else:
+                storage = R2Storage()
+                storage_filename = f"{uuid.uuid4()}_{file_obj.name}"
+                public_url = storage.upload_file(
+                    file_obj, storage_filename, file_obj.content_type
+                )
+                r2_key = f"pdfs/{storage_filename}"
 
             document = Document.objects.create(
                 url=public_url,
                 name=file_obj.name,
                 size=file_obj.size,
                 content_type=file_obj.content_type,
-                r2_key=f"pdfs/{storage_filename}",
+                r2_key=r2_key,
                 hash_md5=metadata["hash_md5"],
                 num_pages=metadata["num_pages"],
                 user=user,
@@ -93,3 +114,221 @@ class DocumentUploadView(APIView):
                 {"error": f"An error occurred during processing: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class DocumentPresignUploadView(APIView):
+    """
+    Primer paso de la subida directa: entrega URL(s) prefirmadas para que el
+    cliente suba el PDF directo a R2 sin pasar por Django.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=serializers.PresignedUploadRequestSerializer,
+        responses={201: serializers.PresignedUploadSerializer},
+        description=(
+            "Request presigned URL(s) to upload a PDF directly to storage. "
+            "Files above the multipart threshold get one URL per part; "
+            "the client must keep each part's ETag and send them to finalize."
+        ),
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.PresignedUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data["name"]
+        size = serializer.validated_data["size"]
+        content_type = serializer.validated_data["content_type"]
+
+        if size > MAX_UPLOAD_SIZE:
+            return Response(
+                {"error": "File size exceeds 50MB limit."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not name.lower().endswith(".pdf") and content_type != "application/pdf":
+            return Response(
+                {"error": "Only PDF files are allowed."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        storage = R2Storage()
+        key = storage.build_key(name)
+        expires_in = settings.R2_PRESIGNED_URL_EXPIRES
+        token_data = {
+            "key": key,
+            "name": name,
+            "size": size,
+            "content_type": content_type,
+            "user_id": request.user.id,
+        }
+
+        if size > settings.R2_MULTIPART_THRESHOLD:
+            upload = storage.create_presigned_multipart_upload(
+                key, content_type, size, expires_in
+            )
+            token_data["upload_id"] = upload["upload_id"]
+            response_data = {"key": key, **upload}
+        else:
+            response_data = {
+                "key": key,
+                "url": storage.create_presigned_upload(key, content_type, expires_in),
+            }
+
+        response_data["upload_token"] = signing.dumps(
+            token_data, salt=UPLOAD_TOKEN_SALT
+        )
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class DocumentFinalizeUploadView(APIView):
+    """
+    Segundo paso de la subida directa: verifica el objeto en R2, crea el
+    Document y encola su procesamiento.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=serializers.FinalizeUploadSerializer,
+        responses={
+            200: serializers.DocumentSerializer,
+            201: serializers.DocumentSerializer,
+        },
+        description=(
+            "Finalize a direct upload. Completes the multipart upload if needed, "
+            "checks the stored object and enqueues text extraction. Repeating "
+            "the call returns the already created document with 200."
+        ),
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.FinalizeUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            upload = signing.loads(
+                serializer.validated_data["upload_token"],
+                salt=UPLOAD_TOKEN_SALT,
+                max_age=settings.R2_PRESIGNED_URL_EXPIRES,
+            )
+        except signing.BadSignature:
+            return Response(
+                {"error": "Invalid or expired upload token."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if upload["user_id"] != request.user.id:
+            return Response(
+                {"error": "Invalid or expired upload token."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        storage = R2Storage()
+        key = upload["key"]
+
+        # Reintento de un finalize que ya se completó: mismo Document
+        document = self.finalized_document(key, request.user)
+        if document is not None:
+            return self.finalized_response(document, status.HTTP_200_OK)
+
+        if "upload_id" in upload:
+            parts = serializer.validated_data.get("parts") or []
+            if not parts or any("etag" not in part for part in parts):
+                return Response(
+                    {"error": "parts with part_number and etag are required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            try:
+                storage.complete_multipart_upload(key, upload["upload_id"], parts)
+            except Exception as e:
+                sentry_logger.error(f"❌ [UPLOAD] Multipart completion failed: {e}")
+                # Sin abortar, R2 cobra las partes subidas indefinidamente
+                try:
+                    storage.abort_multipart_upload(key, upload["upload_id"])
+                except Exception as abort_error:
+                    sentry_logger.error(
+                        f"❌ [UPLOAD] Could not abort multipart upload: {abort_error}"
+                    )
+                return Response(
+                    {"error": "Could not complete the multipart upload."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        head = storage.head_file(key)
+        if head is None:
+            return Response(
+                {"error": "Uploaded file not found."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if head["ContentLength"] > MAX_UPLOAD_SIZE:
+            storage.delete_file(key)
+            return Response(
+                {"error": "File size exceeds 50MB limit."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # En un PUT simple el ETag es el MD5; en multipart no, y process_pdf
+        # calcula el hash y las páginas al descargarlo
+        etag = head.get("ETag", "").strip('"')
+        hash_md5 = etag if len(etag) == 32 and "-" not in etag else ""
+
+        # Mismo contenido ya almacenado: se borra la copia nueva y se reutiliza
+        public_url = storage.get_public_url(key)
+        upload_key = key
+        duplicate = find_duplicate_document(hash_md5)
+        if duplicate is not None and duplicate.r2_key == key:
+            # El objeto ya pertenece a un Document: nunca se borra
+            if duplicate.user_id == request.user.id:
+                return self.finalized_response(duplicate, status.HTTP_200_OK)
+        elif duplicate is not None:
+            storage.delete_file(key)
+            key = duplicate.r2_key
+            public_url = duplicate.url
+
+        document = Document.objects.create(
+            url=public_url,
+            name=upload["name"],
+            size=head["ContentLength"],
+            content_type=upload["content_type"],
+            r2_key=key,
+            hash_md5=hash_md5,
+            num_pages=0,
+            user=request.user,
+        )
+        if key != upload_key:
+            # El objeto subido ya no existe: el reintento se resuelve por caché
+            cache.set(
+                self.finalized_cache_key(upload_key),
+                document.id,
+                timeout=settings.R2_PRESIGNED_URL_EXPIRES,
+            )
+        process_pdf(document.id)
+        return self.finalized_response(document, status.HTTP_201_CREATED)
+
+    @staticmethod
+    def finalized_cache_key(key):
+        return f"documents:finalized:{key}"
+
+    def finalized_document(self, key, user):
+        """
+        Document ya creado por un finalize anterior de la misma subida, o
+        None. Si se deduplicó, su r2_key es otro y se busca por caché.
+        """
+        document = Document.objects.filter(r2_key=key, user=user).first()
+        if document is None:
+            document_id = cache.get(self.finalized_cache_key(key))
+            if document_id is not None:
+                document = Document.objects.filter(id=document_id, user=user).first()
+        return document
+
+    @staticmethod
+    def finalized_response(document, status_code):
+        return Response(
+            {
+                "data": serializers.DocumentSerializer(document).data,
+                "message": "Archivo recibido, procesando.",
+                "status": "success",
+            },
+            status=status_code,
+        )
@@ -1,9 +1,15 @@
 from rest_framework import viewsets, mixins, permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 from apps.documents.models import Document
 from apps.documents import serializers
+from apps.documents.utils import get_document_metadata
+from core.pagination import KeysetPagination
+from core.response_cache import CachedResponseMixin
 
 
 class DocumentViewSet(
+    CachedResponseMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -17,7 +23,20 @@ class DocumentViewSet(
 
     serializer_class = serializers.DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ("-created_at", "-id")
+    lookup_value_regex = r"\d+"
 
     def get_queryset(self):
         """Solo documentos del usuario autenticado"""
         return Document.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, self.retrieve_document, *args, **kwargs)
+
+    def retrieve_document(self, request, *args, **kwargs):
+        """Detalle servido desde la caché de documentos"""
+        data = get_document_metadata(int(kwargs["pk"]))
+        if data is None or data["user"] != request.user.id:
+            raise NotFound()
+        return Response(data)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ExamsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.exams"
+
+    def ready(self):
+        from apps.exams import signals  # noqa: F401
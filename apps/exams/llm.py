@@ -0,0 +1,300 @@
+"""
+Capa de clientes LLM compartidos y límites de concurrencia.
+
+- Clientes Groq/OpenAI síncronos por proceso y async por event loop, con
+  pool de conexiones keep-alive y timeouts explícitos.
+- Cada llamada toma un cupo local (por proceso) y uno global (semáforo en
+  Redis compartido por todos los procesos). Si hay demasiadas peticiones
+  esperando cupo o la espera supera ``LLM_ACQUIRE_TIMEOUT`` se lanza
+  ``LLMBusy`` y la vista responde 503 en vez de acumular trabajo.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+import redis.asyncio
+from django.conf import settings
+from groq import AsyncGroq, Groq
+from openai import AsyncOpenAI, OpenAI
+
+from core.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBusy(Exception):
+    """No hay cupo para otra llamada al LLM en este momento."""
+
+
+def _timeout():
+    return httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=5.0)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+    )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _process_client(name, build):
+    key = (name, os.getpid())
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = build()
+    return client
+
+
+# httpx.AsyncClient queda atado al loop donde se usa por primera vez
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def _loop_client(name, build):
+    clients = _loop_clients.setdefault(asyncio.get_running_loop(), {})
+    if name not in clients:
+        clients[name] = build()
+    return clients[name]
+
+
+def get_groq():
+    """Cliente Groq síncrono compartido por los hilos del proceso actual."""
+    return _process_client(
+        "groq",
+        lambda: Groq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=_timeout(),
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+        ),
+    )
+
+
+def get_async_groq():
+    """Cliente AsyncGroq del event loop en curso."""
+    return _loop_client(
+        "groq",
+        lambda: AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=_timeout(),
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        ),
+    )
+
+
+def get_openai():
+    """Cliente OpenAI síncrono compartido por los hilos del proceso actual."""
+    return _process_client(
+        "openai",
+        lambda: OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=_timeout(),
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+        ),
+    )
+
+
+def get_async_openai():
+    """Cliente AsyncOpenAI del event loop en curso."""
+    return _loop_client(
+        "openai",
+        lambda: AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=_timeout(),
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        ),
+    )
+
+
+# Atómico en Redis: descarta cupos vencidos y toma uno si queda espacio. La
+# hora es la del servidor para no depender del reloj de cada proceso.
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+local now_s = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_s - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now_s, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) + 1)
+    return 1
+end
+return 0
+"""
+
+
+class RedisSemaphore:
+    """
+    Semáforo contador global sobre un sorted set de Redis. Cada cupo es un
+    token con la hora de adquisición como score; los tokens más viejos que
+    ``lease`` se consideran abandonados (proceso caído) y se descartan.
+    """
+
+    def __init__(self, name, limit, lease):
+        self.key = f"llm:semaphore:{name}"
+        self.limit = limit
+        self.lease = lease
+
+    def try_acquire(self, token):
+        return bool(
+            get_redis().eval(ACQUIRE_SCRIPT, 1, self.key, self.limit, self.lease, token)
+        )
+
+    def release(self, token):
+        get_redis().zrem(self.key, token)
+
+    async def atry_acquire(self, client, token):
+        return bool(
+            await client.eval(
+                ACQUIRE_SCRIPT, 1, self.key, self.limit, self.lease, token
+            )
+        )
+
+    async def arelease(self, client, token):
+        await client.zrem(self.key, token)
+
+
+class LLMLimiter:
+    """
+    Cupos de llamadas al LLM: ``max_concurrency`` en vuelo por proceso (un
+    ``threading.BoundedSemaphore`` para código síncrono y un
+    ``asyncio.Semaphore`` por loop para código async), como mucho
+    ``max_queue`` esperando y un tope global en Redis.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, max_concurrency, max_queue, acquire_timeout, global_semaphore):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+        self.global_semaphore = global_semaphore
+        self._threads = threading.BoundedSemaphore(max_concurrency)
+        self._loops = weakref.WeakKeyDictionary()
+        self._redis = weakref.WeakKeyDictionary()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _enqueue(self):
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise LLMBusy("Too many pending LLM requests")
+            self._waiting += 1
+
+    def _dequeue(self):
+        with self._lock:
+            self._waiting -= 1
+
+    def _acquire_global(self, token, deadline):
+        delay = self.POLL_INTERVAL
+        while not self.global_semaphore.try_acquire(token):
+            if time.monotonic() + delay > deadline:
+                raise LLMBusy("Timed out waiting for a global LLM slot")
+            time.sleep(delay)
+            delay = min(delay * 2, 1)
+
+    @contextmanager
+    def slot(self):
+        """Cupo para una llamada síncrona (vistas WSGI, tareas de Huey)."""
+        deadline = time.monotonic() + self.acquire_timeout
+        token = uuid.uuid4().hex
+        self._enqueue()
+        try:
+            if not self._threads.acquire(timeout=self.acquire_timeout):
+                raise LLMBusy("Timed out waiting for an LLM slot")
+            try:
+                self._acquire_global(token, deadline)
+            except BaseException:
+                self._threads.release()
+                raise
+        finally:
+            self._dequeue()
+
+        try:
+            yield
+        finally:
+            self.global_semaphore.release(token)
+            self._threads.release()
+
+    def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._loops.get(loop)
+        if semaphore is None:
+            semaphore = self._loops[loop] = asyncio.Semaphore(self.max_concurrency)
+            self._redis[loop] = redis.asyncio.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+            )
+        return semaphore, self._redis[loop]
+
+    async def _aacquire_global(self, client, token, deadline):
+        delay = self.POLL_INTERVAL
+        while not await self.global_semaphore.atry_acquire(client, token):
+            if time.monotonic() + delay > deadline:
+                raise LLMBusy("Timed out waiting for a global LLM slot")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Cupo para una llamada desde código async (vistas ASGI)."""
+        semaphore, client = self._loop_state()
+        deadline = time.monotonic() + self.acquire_timeout
+        token = uuid.uuid4().hex
+        self._enqueue()
+        try:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                raise LLMBusy("Timed out waiting for an LLM slot")
+            try:
+                await self._aacquire_global(client, token, deadline)
+            except BaseException:
+                semaphore.release()
+                raise
+        finally:
+            self._dequeue()
+
+        try:
+            yield
+        finally:
+            await self.global_semaphore.arelease(client, token)
+            semaphore.release()
+
+
+limiter = LLMLimiter(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    acquire_timeout=settings.LLM_ACQUIRE_TIMEOUT,
+    global_semaphore=RedisSemaphore(
+        "llm",
+        limit=settings.LLM_GLOBAL_MAX_CONCURRENCY,
+        # Un cupo abandonado se libera cuando ya no puede haber llamada en curso
+        lease=settings.LLM_REQUEST_TIMEOUT * (settings.LLM_MAX_RETRIES + 1) + 5,
+    ),
+)
+
+
+def _reset_after_fork():
+    global _clients_lock
+    _clients_lock = threading.Lock()
+    limiter._threads = threading.BoundedSemaphore(limiter.max_concurrency)
+    limiter._lock = threading.Lock()
+    limiter._waiting = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
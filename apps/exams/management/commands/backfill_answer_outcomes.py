@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.exams.models import AnswerOutcome, ExamAttempt, Question
+from apps.exams.utils import build_answer_outcomes
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea las filas AnswerOutcome de los intentos que aún no las tienen, "
+        "por bloques de intentos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        attempts = (
+            ExamAttempt.objects.filter(outcomes__isnull=True)
+            .select_related("exam")
+            .only(
+                "id",
+                "user_id",
+                "answers",
+                "completed_at",
+                "exam__id",
+                "exam__answer_key",
+            )
+            .order_by("id")
+        )
+
+        last_id = 0
+        attempts_done = 0
+        rows_done = 0
+        while True:
+            batch = list(attempts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            rows = [
+                outcome
+                for attempt in batch
+                for outcome in build_answer_outcomes(attempt)
+            ]
+            # La clave de un examen viejo puede nombrar preguntas ya borradas
+            existing = set(
+                Question.objects.filter(
+                    id__in={row.question_id for row in rows}
+                ).values_list("id", flat=True)
+            )
+            rows = [row for row in rows if row.question_id in existing]
+            with transaction.atomic():
+                AnswerOutcome.objects.bulk_create(rows, batch_size=batch_size)
+
+            attempts_done += len(batch)
+            rows_done += len(rows)
+            self.stdout.write(f"{attempts_done} attempts, {rows_done} outcomes...")
+
+        self.stdout.write(
+            f"Backfilled {rows_done} outcomes for {attempts_done} attempts."
+        )
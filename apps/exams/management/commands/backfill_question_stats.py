@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from apps.exams.models import AnswerOutcome, QuestionStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula QuestionStat agregando AnswerOutcome en SQL "
+        "(correr antes backfill_answer_outcomes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Solo este usuario (id)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        outcomes = AnswerOutcome.objects.order_by()
+        stats = QuestionStat.objects.all()
+        if options["user"]:
+            outcomes = outcomes.filter(user_id=options["user"])
+            stats = stats.filter(user_id=options["user"])
+
+        missed = Q(is_correct=False)
+        rows = (
+            outcomes.values("user_id", "question_id")
+            .annotate(
+                attempts=Count("id"),
+                misses=Count("id", filter=missed),
+                last_attempted_at=Max("completed_at"),
+                last_missed_at=Max("completed_at", filter=missed),
+            )
+            .iterator(chunk_size=batch_size)
+        )
+
+        total = 0
+        with transaction.atomic():
+            stats.delete()
+            batch = []
+            for row in rows:
+                batch.append(QuestionStat(**row))
+                if len(batch) >= batch_size:
+                    QuestionStat.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            QuestionStat.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(f"Rebuilt {total} question stats.")
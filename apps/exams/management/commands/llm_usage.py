@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+
+from apps.exams.models import LLMUsage
+
+GROUPINGS = {
+    "endpoint": "endpoint",
+    "user": "user__email",
+    "model": "model",
+}
+
+
+class Command(BaseCommand):
+    help = "Resume tokens, latencia y costo de las llamadas LLM registradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--by", choices=sorted(GROUPINGS), default="endpoint")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        field = GROUPINGS[options["by"]]
+        rows = (
+            LLMUsage.objects.filter(created_at__gte=since)
+            .values(field)
+            .annotate(
+                calls=Count("id"),
+                prompt_tokens=Sum("prompt_tokens"),
+                completion_tokens=Sum("completion_tokens"),
+                latency_ms=Avg("latency_ms"),
+                cost_usd=Sum("cost_usd"),
+            )
+            .order_by("-cost_usd")
+        )
+        if not rows:
+            self.stdout.write("No LLM usage recorded in that period.")
+            return
+
+        for row in rows:
+            self.stdout.write(
+                f"{row[field] or '-'}: calls={row['calls']} "
+                f"prompt_tokens={row['prompt_tokens']} "
+                f"completion_tokens={row['completion_tokens']} "
+                f"avg_latency={row['latency_ms'] / 1000:.2f}s "
+                f"cost=${row['cost_usd']:.6f}"
+            )
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_exams_done(apps, schema_editor):
+    # Los exámenes anteriores se generaban de forma síncrona: ya están listos
+    Exam = apps.get_model("exams", "Exam")
+    Exam.objects.update(status="done")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "exams",
+            "0005_rename_exams_exama_user_comp_idx_exams_exama_user_id_df4f06_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="finished_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="queued_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "En cola"),
+                    ("processing", "Generando"),
+                    ("done", "Listo"),
+                    ("failed", "Fallido"),
+                ],
+                default="queued",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(mark_existing_exams_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0006_exam_status_lifecycle"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("endpoint", models.CharField(blank=True, default="", max_length=50)),
+                ("provider", models.CharField(max_length=20)),
+                ("model", models.CharField(max_length=100)),
+                ("prompt_tokens", models.IntegerField(default=0)),
+                ("completion_tokens", models.IntegerField(default=0)),
+                ("latency_ms", models.IntegerField(default=0)),
+                (
+                    "cost_usd",
+                    models.DecimalField(decimal_places=8, default=0, max_digits=12),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="usage",
+                        to="exams.exam",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "created_at"],
+                        name="exams_llmus_user_id_dc7163_idx",
+                    ),
+                    models.Index(
+                        fields=["endpoint", "created_at"],
+                        name="exams_llmus_endpoin_60a69c_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
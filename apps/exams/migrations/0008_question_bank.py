@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0003_document_processing_progress"),
+        ("exams", "0007_llm_usage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BankQuestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("page_start", models.IntegerField()),
+                ("page_end", models.IntegerField()),
+                ("question", models.TextField()),
+                ("options", models.JSONField()),
+                (
+                    "difficulty",
+                    models.CharField(
+                        choices=[
+                            ("facil", "Fácil"),
+                            ("medio", "Medio"),
+                            ("dificil", "Difícil"),
+                        ],
+                        default="medio",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bank_questions",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["document", "page_start", "page_end"],
+                        name="exams_bankq_documen_3e960a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
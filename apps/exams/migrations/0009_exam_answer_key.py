@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:54
+
+from django.db import migrations, models
+
+
+def build_answer_keys(apps, schema_editor):
+    Exam = apps.get_model("exams", "Exam")
+    Question = apps.get_model("exams", "Question")
+
+    def save(exam_id, answers):
+        Exam.objects.filter(id=exam_id).update(
+            answer_key={"total": len(answers), "answers": answers}
+        )
+
+    # Ordenado por examen: se guarda cada clave al pasar al siguiente
+    current_exam, answers = None, {}
+    for exam_id, question_id, options in (
+        Question.objects.order_by("exam_id", "id")
+        .values_list("exam_id", "id", "options")
+        .iterator(chunk_size=2000)
+    ):
+        if exam_id != current_exam:
+            if current_exam is not None:
+                save(current_exam, answers)
+            current_exam, answers = exam_id, {}
+        answers[str(question_id)] = next(
+            (o.get("id") for o in options if o.get("isCorrect")), None
+        )
+    if current_exam is not None:
+        save(current_exam, answers)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0008_question_bank"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="answer_key",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(build_answer_keys, migrations.RunPython.noop),
+    ]
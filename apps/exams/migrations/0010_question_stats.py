@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0009_exam_answer_key"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("misses", models.IntegerField(default=0)),
+                ("last_attempted_at", models.DateTimeField(blank=True, null=True)),
+                ("last_missed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="exams.question",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_stats",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-misses", "-last_missed_at"],
+                        name="exams_quest_user_id_0ccba1_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "question"), name="unique_question_stat"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0010_question_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="is_review",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="exam",
+            name="page_end",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="exam",
+            name="page_start",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ExamQuestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="exams.exam",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exam_links",
+                        to="exams.question",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="linked_questions",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="review_exams",
+                through="exams.ExamQuestion",
+                to="exams.question",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="examquestion",
+            constraint=models.UniqueConstraint(
+                fields=("exam", "position"), name="unique_exam_question_position"
+            ),
+        ),
+    ]
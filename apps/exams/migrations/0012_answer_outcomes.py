@@ -0,0 +1,75 @@
+# Generated by Django 5.2.9 on 2026-10-16 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0011_review_exam_links"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnswerOutcome",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "selected_option",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                ("is_correct", models.BooleanField()),
+                ("completed_at", models.DateTimeField()),
+                (
+                    "attempt",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outcomes",
+                        to="exams.examattempt",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outcomes",
+                        to="exams.question",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.user",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "completed_at"],
+                        name="exams_answe_user_id_17cb66_idx",
+                    ),
+                    models.Index(
+                        fields=["user", "question"],
+                        name="exams_answe_user_id_ecdc88_idx",
+                    ),
+                    models.Index(
+                        fields=["question", "is_correct"],
+                        name="exams_answe_questio_d80b50_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
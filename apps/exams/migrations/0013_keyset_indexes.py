@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0004_keyset_indexes"),
+        ("exams", "0012_answer_outcomes"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="examattempt",
+            name="exams_exama_user_id_df4f06_idx",
+        ),
+        migrations.AddIndex(
+            model_name="exam",
+            index=models.Index(
+                fields=["user", "created_at", "id"],
+                name="exams_exam_user_id_81ebde_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="examattempt",
+            index=models.Index(
+                fields=["user", "completed_at", "id"],
+                name="exams_exama_user_id_61fcdd_idx",
+            ),
+        ),
+    ]
@@ -1,19 +1,124 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from apps.documents.models import Document
 from apps.users.models import User
 
 
 class Exam(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
     document = models.ForeignKey(Document, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    page_start = models.IntegerField()
-    page_end = models.IntegerField()
+    # Sin rango en los exámenes de repaso
+    page_start = models.IntegerField(null=True, blank=True)
+    page_end = models.IntegerField(null=True, blank=True)
     num_questions = models.IntegerField(default=10)
+    # Los exámenes de repaso no tienen preguntas propias: enlazan las
+    # originales en orden a través de ExamQuestion
+    is_review = models.BooleanField(default=False)
+    linked_questions = models.ManyToManyField(
+        "Question", through="ExamQuestion", related_name="review_exams", blank=True
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_QUEUED, "En cola"),
+            (STATUS_PROCESSING, "Generando"),
+            (STATUS_DONE, "Listo"),
+            (STATUS_FAILED, "Fallido"),
+        ],
+        default=STATUS_QUEUED,
+    )
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    # {"total": n, "answers": {"<question_id>": "<id de la opción correcta>"}}
+    answer_key = models.JSONField(default=dict, blank=True)
     created_at = models.DateField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.document} - {self.user}"
 
+    class Meta:
+        indexes = [
+            # Llave de la paginación por cursor del listado
+            models.Index(fields=["user", "created_at", "id"]),
+        ]
+
+    @staticmethod
+    def build_answer_key(questions):
+        answers = {
+            str(question.id): next(
+                (o.get("id") for o in question.options if o.get("isCorrect")), None
+            )
+            for question in questions
+        }
+        return {"total": len(answers), "answers": answers}
+
+    def get_questions(self):
+        """Preguntas del examen en orden: propias o enlazadas si es de repaso"""
+        if self.is_review:
+            return Question.objects.filter(exam_links__exam_id=self.pk).order_by(
+                "exam_links__position"
+            )
+        return Question.objects.filter(exam_id=self.pk)
+
+    def refresh_answer_key(self, questions=None):
+        """
+        Recalcula y guarda la clave de respuestas. ``questions`` (recién
+        creadas con bulk_create) evita volver a leerlas de la DB.
+        """
+        if questions is None:
+            questions = self.get_questions().only("id", "options")
+        self.answer_key = self.build_answer_key(questions)
+        Exam.objects.filter(pk=self.pk).update(answer_key=self.answer_key)
+        return self.answer_key
+
+    @classmethod
+    def update_answer_key_entry(cls, exam_id, question, removed=False):
+        """
+        Actualiza solo la entrada de ``question`` en la clave de respuestas,
+        sin releer el resto de preguntas: guardar n preguntas una a una cuesta
+        O(n) y no O(n²). Si el examen todavía no tiene clave, se calcula
+        completa.
+        """
+        with transaction.atomic():
+            exam = (
+                cls.objects.select_for_update()
+                .only("id", "is_review", "answer_key")
+                .filter(pk=exam_id)
+                .first()
+            )
+            if exam is None:
+                return None
+            if not exam.answer_key:
+                return exam.refresh_answer_key()
+            answers = dict(exam.answer_key.get("answers", {}))
+            if removed:
+                answers.pop(str(question.pk), None)
+            else:
+                answers.update(cls.build_answer_key([question])["answers"])
+            exam.answer_key = {"total": len(answers), "answers": answers}
+            cls.objects.filter(pk=exam_id).update(answer_key=exam.answer_key)
+            return exam.answer_key
+
+    def set_status(self, status, error=""):
+        """Avanza el ciclo queued → processing → done/failed guardando tiempos"""
+        self.status = status
+        fields = ["status"]
+        if status == self.STATUS_PROCESSING:
+            self.started_at = timezone.now()
+            fields.append("started_at")
+        elif status in (self.STATUS_DONE, self.STATUS_FAILED):
+            self.finished_at = timezone.now()
+            self.error = error
+            fields += ["finished_at", "error"]
+        self.save(update_fields=fields)
+
 
 class Question(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="questions")
@@ -34,6 +139,58 @@ class Question(models.Model):
         return f"{self.question[:50]}... - {self.exam}"
 
 
+class ExamQuestion(models.Model):
+    """Pregunta enlazada en un examen de repaso, en la posición ``position``"""
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="items")
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="exam_links"
+    )
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["exam", "position"], name="unique_exam_question_position"
+            ),
+        ]
+
+
+class BankQuestion(models.Model):
+    """
+    Pregunta pre-generada en segundo plano para una ventana de páginas
+    [page_start, page_end] de un documento; los exámenes se arman tomando
+    preguntas de aquí sin llamar al LLM.
+    """
+
+    document = models.ForeignKey(
+        Document, on_delete=models.CASCADE, related_name="bank_questions"
+    )
+    page_start = models.IntegerField()
+    page_end = models.IntegerField()
+    question = models.TextField()
+    options = models.JSONField()
+    difficulty = models.CharField(
+        max_length=20,
+        choices=[
+            ("facil", "Fácil"),
+            ("medio", "Medio"),
+            ("dificil", "Difícil"),
+        ],
+        default="medio",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.question[:50]}... - {self.document} p{self.page_start}-{self.page_end}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["document", "page_start", "page_end"]),
+        ]
+
+
 class ExamAttempt(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="attempts")
     user = models.ForeignKey(
@@ -51,6 +208,93 @@ class ExamAttempt(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["user", "completed_at"]),
+            # Llave de la paginación por cursor del listado
+            models.Index(fields=["user", "completed_at", "id"]),
             models.Index(fields=["exam"]),
         ]
+
+
+class AnswerOutcome(models.Model):
+    """
+    Una fila por pregunta de cada intento (las no respondidas quedan con
+    ``selected_option`` vacío), para agregar en SQL sin leer
+    ``ExamAttempt.answers``.
+    """
+
+    attempt = models.ForeignKey(
+        ExamAttempt, on_delete=models.CASCADE, related_name="outcomes"
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="outcomes"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    selected_option = models.CharField(max_length=64, blank=True, default="")
+    is_correct = models.BooleanField()
+    completed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "completed_at"]),
+            models.Index(fields=["user", "question"]),
+            models.Index(fields=["question", "is_correct"]),
+        ]
+
+
+class QuestionStat(models.Model):
+    """
+    Resultados acumulados (de siempre) de un usuario en una pregunta. Se
+    actualiza al registrar cada intento y sirve los exámenes de repaso sin
+    periodo; los que piden un periodo agregan ``AnswerOutcome`` del rango.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="question_stats"
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="stats"
+    )
+    attempts = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    last_attempted_at = models.DateTimeField(null=True, blank=True)
+    last_missed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.question_id}: {self.misses}/{self.attempts}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "question"], name="unique_question_stat"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-misses", "-last_missed_at"]),
+        ]
+
+
+class LLMUsage(models.Model):
+    """Una llamada al proveedor LLM: tokens, latencia y costo estimado"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    exam = models.ForeignKey(
+        Exam, on_delete=models.SET_NULL, null=True, blank=True, related_name="usage"
+    )
+    endpoint = models.CharField(max_length=50, blank=True, default="")
+    provider = models.CharField(max_length=20)
+    model = models.CharField(max_length=100)
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    latency_ms = models.IntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=8, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.provider}/{self.model} - {self.endpoint} - ${self.cost_usd}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["endpoint", "created_at"]),
+        ]
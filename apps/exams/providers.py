@@ -0,0 +1,393 @@
+"""
+Proveedores LLM intercambiables (``LLM_PROVIDER``) y registro de uso.
+
+Todos exponen la misma interfaz sobre mensajes estilo chat completions:
+``complete``, ``acomplete``, ``stream`` y ``astream``. Cada llamada pasa por el limitador
+de ``apps.exams.llm`` y queda registrada en ``LLMUsage`` con tokens, latencia
+y costo, atribuida al usuario/examen/endpoint de ``usage_context``.
+"""
+
+import abc
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.exams import llm
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Completion:
+    content: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+_usage_context = contextvars.ContextVar("llm_usage_context", default={})
+
+
+@contextmanager
+def usage_context(**fields):
+    """
+    Atribuye las llamadas LLM hechas dentro del bloque: ``user_id``,
+    ``exam_id`` y ``endpoint``. Los bloques anidados heredan lo de afuera.
+    """
+    token = _usage_context.set({**_usage_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _usage_context.reset(token)
+
+
+def record_usage(provider, completion, latency, context):
+    from apps.exams.models import LLMUsage
+
+    cost = provider.cost(completion.prompt_tokens, completion.completion_tokens)
+    logger.info(
+        f"✅ [LLM] {provider.name}/{provider.model} {context.get('endpoint', '-')}: "
+        f"{completion.prompt_tokens}+{completion.completion_tokens} tokens, "
+        f"{latency:.2f}s, ${cost:.6f}"
+    )
+    try:
+        LLMUsage.objects.create(
+            user_id=context.get("user_id"),
+            exam_id=context.get("exam_id"),
+            endpoint=context.get("endpoint", ""),
+            provider=provider.name,
+            model=provider.model,
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens,
+            latency_ms=int(latency * 1000),
+            cost_usd=cost,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️  [LLM] Could not record usage: {e}")
+
+
+class LLMProvider(abc.ABC):
+    """
+    Base de los proveedores. Las subclases implementan ``_complete``,
+    ``_acomplete``, ``_stream`` y ``_astream``; aquí se aplican los cupos y
+    se registra el uso de cada llamada (también de streams interrumpidos).
+    """
+
+    name = None
+
+    def __init__(self, model):
+        self.model = model
+        input_price, output_price = settings.LLM_PRICES.get(model, (0, 0))
+        self.input_price = Decimal(str(input_price))
+        self.output_price = Decimal(str(output_price))
+
+    @property
+    def cache_key(self):
+        return f"{self.name}:{self.model}"
+
+    def cost(self, prompt_tokens, completion_tokens):
+        """Costo en USD con precios por millón de tokens"""
+        return (
+            prompt_tokens * self.input_price + completion_tokens * self.output_price
+        ) / 1_000_000
+
+    def complete(self, messages, response_format):
+        """Retorna el contenido de la respuesta"""
+        context = _usage_context.get()
+        with llm.limiter.slot():
+            started = time.monotonic()
+            completion = self._complete(messages, response_format)
+            latency = time.monotonic() - started
+        record_usage(self, completion, latency, context)
+        return completion.content
+
+    async def acomplete(self, messages, response_format):
+        context = _usage_context.get()
+        async with llm.limiter.aslot():
+            started = time.monotonic()
+            completion = await self._acomplete(messages, response_format)
+            latency = time.monotonic() - started
+        await sync_to_async(record_usage, thread_sensitive=False)(
+            self, completion, latency, context
+        )
+        return completion.content
+
+    @contextmanager
+    def stream(self, messages, response_format, attribution=None):
+        """
+        Entrega un iterador de fragmentos de texto. El cupo se mantiene
+        hasta cerrar el bloque y el uso se registra al final, atribuido a
+        ``attribution`` o, si no se indica, a ``usage_context``.
+        """
+        context = attribution if attribution is not None else _usage_context.get()
+        completion = Completion()
+        with llm.limiter.slot():
+            started = time.monotonic()
+            fragments = self._stream(messages, response_format, completion)
+            try:
+                yield fragments
+            finally:
+                fragments.close()
+                # También si el consumidor se corta a mitad: lo ya generado
+                # se cobra igual
+                record_usage(self, completion, time.monotonic() - started, context)
+
+    @asynccontextmanager
+    async def astream(self, messages, response_format, attribution=None):
+        """
+        Versión async de ``stream``: entrega un iterador async de fragmentos
+        para vistas ASGI, sin ocupar un hilo mientras el modelo escribe.
+        """
+        context = attribution if attribution is not None else _usage_context.get()
+        completion = Completion()
+        async with llm.limiter.aslot():
+            started = time.monotonic()
+            fragments = self._astream(messages, response_format, completion)
+            try:
+                yield fragments
+            finally:
+                await fragments.aclose()
+                await sync_to_async(record_usage, thread_sensitive=False)(
+                    self, completion, time.monotonic() - started, context
+                )
+
+    @abc.abstractmethod
+    def _complete(self, messages, response_format):
+        """Retorna un ``Completion`` con el contenido y los tokens usados"""
+
+    @abc.abstractmethod
+    async def _acomplete(self, messages, response_format):
+        """Versión async de ``_complete``"""
+
+    @abc.abstractmethod
+    def _stream(self, messages, response_format, completion):
+        """Generador de fragmentos; acumula contenido y tokens en ``completion``"""
+
+    @abc.abstractmethod
+    def _astream(self, messages, response_format, completion):
+        """Versión async (generador async) de ``_stream``"""
+
+
+class ChatCompletionsProvider(LLMProvider):
+    """Proveedores con API compatible con OpenAI chat completions"""
+
+    stream_options = {}
+
+    @abc.abstractmethod
+    def client(self):
+        """Cliente síncrono del SDK (compartido por proceso)"""
+
+    @abc.abstractmethod
+    def async_client(self):
+        """Cliente async del SDK (compartido por event loop)"""
+
+    @staticmethod
+    def _completion(response):
+        usage = response.usage
+        return Completion(
+            content=response.choices[0].message.content or "",
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+        )
+
+    @staticmethod
+    def _consume_chunk(chunk, completion):
+        """Acumula el uso y el texto de un chunk; retorna el texto nuevo"""
+        usage = getattr(chunk, "usage", None) or getattr(
+            getattr(chunk, "x_groq", None), "usage", None
+        )
+        if usage is not None:
+            completion.prompt_tokens = usage.prompt_tokens
+            completion.completion_tokens = usage.completion_tokens
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return ""
+        completion.content += chunk.choices[0].delta.content
+        return chunk.choices[0].delta.content
+
+    def _complete(self, messages, response_format):
+        response = self.client().chat.completions.create(
+            model=self.model, messages=messages, response_format=response_format
+        )
+        return self._completion(response)
+
+    async def _acomplete(self, messages, response_format):
+        response = await self.async_client().chat.completions.create(
+            model=self.model, messages=messages, response_format=response_format
+        )
+        return self._completion(response)
+
+    def _stream(self, messages, response_format, completion):
+        response = self.client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format=response_format,
+            stream=True,
+            **self.stream_options,
+        )
+        try:
+            for chunk in response:
+                content = self._consume_chunk(chunk, completion)
+                if content:
+                    yield content
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+
+    async def _astream(self, messages, response_format, completion):
+        response = await self.async_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format=response_format,
+            stream=True,
+            **self.stream_options,
+        )
+        try:
+            async for chunk in response:
+                content = self._consume_chunk(chunk, completion)
+                if content:
+                    yield content
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                await close()
+
+
+class GroqProvider(ChatCompletionsProvider):
+    name = "groq"
+
+    def client(self):
+        return llm.get_groq()
+
+    def async_client(self):
+        return llm.get_async_groq()
+
+
+class OpenAIProvider(ChatCompletionsProvider):
+    name = "openai"
+    stream_options = {"stream_options": {"include_usage": True}}
+
+    def client(self):
+        return llm.get_openai()
+
+    def async_client(self):
+        return llm.get_async_openai()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Proveedor local sin red para pruebas de carga y desarrollo offline.
+    Responde preguntas válidas según el schema, deterministas para el mismo
+    prompt, después de ``latency`` segundos. El número de preguntas y las
+    cuotas por dificultad se leen del prompt de sistema.
+    """
+
+    name = "fake"
+    COUNT = re.compile(r"Genera (\d+) preguntas")
+    DIFFICULTY = re.compile(r"(\d+) de dificultad (easy|medium|hard)")
+    STREAM_CHUNK = 40
+
+    def __init__(self, model, latency=None):
+        super().__init__(model)
+        self.latency = latency if latency is not None else settings.FAKE_LLM_LATENCY
+
+    def _build(self, messages):
+        system = messages[0]["content"]
+        context = messages[-1]["content"]
+        count = self.COUNT.search(system)
+        difficulties = [
+            difficulty
+            for quota, difficulty in self.DIFFICULTY.findall(system)
+            for _ in range(int(quota))
+        ]
+        rng = random.Random(hashlib.sha256((system + context).encode()).digest())
+        words = context.split() or ["texto"]
+
+        questions = []
+        for i in range(int(count.group(1)) if count else 5):
+            fragment = " ".join(rng.choice(words) for _ in range(4))
+            correct = rng.randrange(4)
+            questions.append(
+                {
+                    "question": (
+                        f"¿Qué afirma el texto sobre «{fragment}»? "
+                        f"({rng.getrandbits(64):016x})"
+                    ),
+                    "options": [
+                        {"text": f"Opción {i + 1}", "isCorrect": i == correct}
+                        for i in range(4)
+                    ],
+                    "difficulty": (
+                        difficulties[i]
+                        if i < len(difficulties)
+                        else rng.choice(["easy", "medium", "hard"])
+                    ),
+                }
+            )
+
+        content = json.dumps({"questions": questions}, ensure_ascii=False)
+        # Aproximación de ~4 caracteres por token
+        return Completion(
+            content=content,
+            prompt_tokens=(len(system) + len(context)) // 4,
+            completion_tokens=len(content) // 4,
+        )
+
+    def _complete(self, messages, response_format):
+        time.sleep(self.latency)
+        return self._build(messages)
+
+    async def _acomplete(self, messages, response_format):
+        await asyncio.sleep(self.latency)
+        return self._build(messages)
+
+    def _chunks(self, messages, completion):
+        built = self._build(messages)
+        completion.prompt_tokens = built.prompt_tokens
+        completion.completion_tokens = built.completion_tokens
+        return [
+            built.content[i : i + self.STREAM_CHUNK]
+            for i in range(0, len(built.content), self.STREAM_CHUNK)
+        ]
+
+    def _stream(self, messages, response_format, completion):
+        chunks = self._chunks(messages, completion)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            completion.content += chunk
+            yield chunk
+
+    async def _astream(self, messages, response_format, completion):
+        chunks = self._chunks(messages, completion)
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            completion.content += chunk
+            yield chunk
+
+
+PROVIDERS = {
+    "groq": lambda: GroqProvider(settings.GROQ_MODEL),
+    "openai": lambda: OpenAIProvider(settings.OPENAI_MODEL),
+    "fake": lambda: FakeProvider("fake"),
+}
+
+_providers = {}
+
+
+def get_provider(name=None):
+    """Proveedor configurado en ``LLM_PROVIDER`` (o el indicado)"""
+    name = name or settings.LLM_PROVIDER
+    provider = _providers.get(name)
+    if provider is None:
+        provider = _providers[name] = PROVIDERS[name]()
+    return provider
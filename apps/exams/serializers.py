@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from apps.exams.models import Exam, Question, ExamAttempt
 
@@ -5,8 +6,27 @@ from apps.exams.models import Exam, Question, ExamAttempt
 class ExamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
-        fields = "__all__"
-        read_only_fields = ["user"]
+        # answer_key tiene las respuestas correctas: nunca se expone
+        exclude = ["answer_key", "linked_questions"]
+        read_only_fields = [
+            "user",
+            "status",
+            "queued_at",
+            "started_at",
+            "finished_at",
+            "error",
+            "is_review",
+        ]
+        # Solo los exámenes de repaso no tienen rango de páginas
+        extra_kwargs = {
+            "page_start": {"required": True, "allow_null": False},
+            "page_end": {"required": True, "allow_null": False},
+            # Acota cuántos lotes concurrentes puede pedir un solo examen
+            "num_questions": {
+                "min_value": 1,
+                "max_value": settings.GENERATION_MAX_QUESTIONS,
+            },
+        }
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -28,14 +48,24 @@ class ExamAttemptSerializer(serializers.ModelSerializer):
 
 
 class CreateExamAttemptSerializer(serializers.Serializer):
-    answers = serializers.DictField()
+    # Pregunta -> id de opción; coincide con AnswerOutcome.selected_option
+    answers = serializers.DictField(
+        child=serializers.CharField(max_length=64, allow_blank=True, allow_null=True)
+    )
     started_at = serializers.DateTimeField()
     completed_at = serializers.DateTimeField()
 
+    def validate_answers(self, answers):
+        # null es una pregunta saltada: se puntúa y se guarda como sin responder
+        return {
+            question_id: option_id or "" for question_id, option_id in answers.items()
+        }
+
 
 class CreateFailureExamSerializer(serializers.Serializer):
-    start_date = serializers.DateTimeField()
-    end_date = serializers.DateTimeField()
+    # Sin fechas se toman los fallos de siempre
+    start_date = serializers.DateTimeField(required=False)
+    end_date = serializers.DateTimeField(required=False)
     num_questions = serializers.IntegerField(max_value=20, default=10)
 
 
@@ -57,3 +87,49 @@ class ExamCreationResponseSerializer(serializers.Serializer):
     """Response when creating a new exam with generated questions"""
     exam = ExamSerializer(read_only=True)
     questions = GeneratedQuestionSerializer(many=True, read_only=True)
+
+
+class TakeOptionSerializer(serializers.Serializer):
+    """Answer option without the isCorrect flag"""
+    id = serializers.UUIDField()
+    text = serializers.CharField()
+
+
+class TakeQuestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    question = serializers.CharField()
+    options = TakeOptionSerializer(many=True)
+    difficulty = serializers.ChoiceField(choices=["easy", "medium", "hard"])
+
+
+class TakeExamSerializer(serializers.Serializer):
+    """Exam with its questions for answering it, correct answers stripped"""
+    exam = ExamSerializer(read_only=True)
+    questions = TakeQuestionSerializer(many=True, read_only=True)
+
+
+class ExamStatusSerializer(serializers.ModelSerializer):
+    """Estado de generación de un examen (para consultas periódicas)"""
+    questions_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Exam
+        fields = [
+            "id",
+            "status",
+            "num_questions",
+            "questions_count",
+            "queued_at",
+            "started_at",
+            "finished_at",
+            "error",
+        ]
+
+    def get_questions_count(self, obj):
+        return obj.get_questions().count()
+
+
+class ExamQueuedResponseSerializer(serializers.Serializer):
+    """Response when an exam is queued for asynchronous generation"""
+    exam = ExamSerializer(read_only=True)
+    status_url = serializers.CharField()
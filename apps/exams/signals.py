@@ -0,0 +1,92 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.documents.models import Document
+from apps.exams.models import Exam, ExamAttempt, ExamQuestion, Question
+from apps.users.models import User
+from apps.exams.utils import invalidate_exam_cache
+from core.response_cache import invalidate_user_responses
+
+# Intento guardado junto con sus AnswerOutcome, dentro de la misma
+# transacción. Argumentos: ``attempt`` y ``outcomes``.
+attempt_recorded = Signal()
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def invalidate_exam(sender, instance, **kwargs):
+    invalidate_exam_cache(instance.id)
+    invalidate_user_responses(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=ExamAttempt)
+def invalidate_attempt_responses(sender, instance, **kwargs):
+    invalidate_user_responses(instance.user_id)
+
+
+# Modelo que inició un borrado en cascada → campo de Exam que lo referencia
+CASCADE_LOOKUPS = {Exam: "pk", Document: "document", User: "user"}
+
+
+def _is_model(origin, model):
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+def _deleted_with_exam(origin, exam_id):
+    """
+    True si el borrado que inició ``origin`` (instancia o QuerySet) también
+    borra el examen ``exam_id``: entonces no vale la pena tocar su clave.
+    """
+    for model, lookup in CASCADE_LOOKUPS.items():
+        if not _is_model(origin, model):
+            continue
+        if isinstance(origin, Exam):
+            return origin.pk == exam_id
+        origins = origin if isinstance(origin, QuerySet) else [origin.pk]
+        return Exam.objects.filter(pk=exam_id, **{f"{lookup}__in": origins}).exists()
+    return False
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_exam_questions_cache(sender, instance, **kwargs):
+    # bulk_create no dispara señales: quien lo usa refresca la clave a mano
+    removed = kwargs["signal"] is post_delete
+    # Una pregunta solo se borra en cascada junto con su examen (y sus
+    # enlaces de repaso los atiende ExamQuestion): borrar un documento con
+    # N exámenes de M preguntas no hace N·M actualizaciones con lock
+    if removed and not _is_model(kwargs.get("origin"), Question):
+        return
+    Exam.update_answer_key_entry(instance.exam_id, instance, removed=removed)
+    invalidate_exam_cache(instance.exam_id)
+    # Exámenes de repaso que enlazan la pregunta editada (al borrarla, sus
+    # enlaces ya se borraron en cascada y los atiende ExamQuestion)
+    review_exam_ids = ExamQuestion.objects.filter(question_id=instance.id).values_list(
+        "exam_id", flat=True
+    )
+    for exam_id in review_exam_ids:
+        Exam.update_answer_key_entry(exam_id, instance)
+        invalidate_exam_cache(exam_id)
+
+
+@receiver(post_delete, sender=ExamQuestion)
+def shrink_review_exam(sender, instance, **kwargs):
+    """
+    Borrar una pregunta original borra en cascada sus enlaces: el examen de
+    repaso se queda sin ella, así que se ajustan la clave y ``num_questions``
+    para que se siga puntuando sobre las preguntas que quedan. Si el examen
+    de repaso se está borrando en la misma cascada no hay nada que ajustar.
+    """
+    if _deleted_with_exam(kwargs.get("origin"), instance.exam_id):
+        return
+    answer_key = Exam.update_answer_key_entry(
+        instance.exam_id, Question(pk=instance.question_id), removed=True
+    )
+    invalidate_exam_cache(instance.exam_id)
+    if answer_key is None:
+        return
+    # update() no dispara señales: se invalidan a mano las respuestas del dueño
+    exam = Exam.objects.filter(pk=instance.exam_id)
+    exam.update(num_questions=answer_key["total"])
+    invalidate_user_responses(exam.values_list("user_id", flat=True).first())
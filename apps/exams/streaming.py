@@ -0,0 +1,69 @@
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+QUESTIONS_ARRAY = re.compile(r'"questions"\s*:\s*\[')
+
+
+class QuestionStreamParser:
+    """
+    Parser incremental de una respuesta ``{"questions": [{...}, {...}]}`` que
+    llega en fragmentos. ``feed`` retorna las preguntas que quedaron completas
+    con ese fragmento, sin esperar a que termine el documento.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+        self.finished = False
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        completed = []
+
+        if self._pos is None:
+            match = QUESTIONS_ARRAY.search(self._buffer)
+            if match is None:
+                return completed
+            self._pos = match.end()
+
+        while self._pos < len(self._buffer) and not self.finished:
+            char = self._buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Cierre del arreglo de preguntas
+                    self.finished = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(
+                        json.loads(self._buffer[self._object_start : self._pos + 1])
+                    )
+                    self._object_start = None
+            self._pos += 1
+
+        return completed
+
+
+def sse_event(event, data):
+    """Formatea un evento de Server-Sent Events"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
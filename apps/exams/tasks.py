@@ -1,14 +1,20 @@
 import logging
 import django
 import os
+from django.conf import settings
 from huey.contrib.djhuey import db_task
-from langchain_core.prompts import ChatPromptTemplate
-from apps.documents.models import Block
-from apps.exams.models import Exam, Question
-from langchain.agents import create_agent
-from typing_extensions import TypedDict, Literal
-import json
-from typing import cast
+from redis.exceptions import LockError
+from apps.documents.models import Document
+from apps.documents.utils import get_page_range_text
+from apps.exams.models import BankQuestion, Exam
+from apps.exams.providers import usage_context
+from apps.exams.utils import (
+    generate_exam_questions,
+    generate_questions,
+    notify_exam_status,
+    translate_difficulty,
+)
+from core.cache import get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -17,130 +23,141 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 django.setup()
 
 
-class OptionsModel(TypedDict):
-    text: str
-    isCorrect: bool
-
-
-class QuestionModel(TypedDict):
-    """List of questions."""
-
-    question: str
-    options: list[OptionsModel]
-    difficulty: Literal["easy", "medium", "hard"]
-
-
-class QuestionList(TypedDict):
-    questions: list[QuestionModel]
-
+@db_task()
+def create_exam(exam_id, fresh=False):
+    """
+    Genera en segundo plano las preguntas de un examen creado en modo
+    asíncrono (estado ``queued``).
+    """
+    logger.info("Starting Exam creation for exam: %s", exam_id)
 
-class GeneradorExamenes:
-    def __init__(self):
-        self.llm = create_agent(model="gpt-5-mini", response_format=QuestionList)
+    try:
+        exam = Exam.objects.get(id=exam_id)
+    except Exam.DoesNotExist:
+        logger.error("Exam not found: %s", exam_id)
+        raise
 
-        self.prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    (
-                        "You are an expert in creating educational exams. "
-                        "Generate high-quality multiple-choice questions based ONLY on the provided context. "
-                        "Generate {batch_size} new questions WITHOUT repeating topics already covered. "
-                        "Exactly one option must be correct (is_correct=true). "
-                        "Questions must be clear, precise, and have 4 options. "
-                        "Classify them as easy, medium, or hard."
-                    ),
-                ),
-                ("human", "Context for the questions:\n\n{context}"),
-            ]
+    base_text = get_page_range_text(exam.document_id, exam.page_start, exam.page_end)
+    if not base_text:
+        logger.error("No blocks found for document: %s", exam.document_id)
+        exam.set_status(
+            Exam.STATUS_FAILED, error="No content found for the selected pages"
         )
+        notify_exam_status(exam, exam.status)
+        return {"status": "failed", "exam_id": exam_id}
 
-        self.chain = self.prompt | self.llm
-
-    def generate(self, base_text: str, total_questions: int) -> QuestionList:
-        """
-        Generates questions in batches to ensure quality and avoid token limits.
-        """
+    try:
+        questions = generate_exam_questions(
+            exam, base_text, fresh=fresh, endpoint="exams.create_async"
+        )
+    except Exception as exc:
+        logger.error("Error creating exam %s: %s", exam_id, exc)
+        raise
 
-        try:
-            resultado = self.chain.invoke(
-                {
-                    "context": base_text,
-                    "batch_size": total_questions,
-                }
-            )
-            # Convertimos el string a un diccionario normal
-            logger.info("Response: 1")
-            data_dict = json.loads(resultado["messages"][-1].content)
-            logger.info("Response: 2")
-            questions_data = cast(QuestionList, data_dict)
-            logger.info("response 3")
-            return questions_data
+    logger.info("Exam %s completed with %d questions.", exam_id, len(questions))
 
-        except Exception as e:
-            raise e
+    return {
+        "status": "success",
+        "exam_id": exam_id,
+        "questions_count": len(questions),
+    }
 
 
-@db_task()
-def create_exam(document_id, page_start, page_end, exam_id):
+def schedule_question_bank(document):
     """
-    Tarea para generar preguntas de examen usando LangChain y OpenRouter.
+    Encola, si está habilitado, la pre-generación del banco de preguntas del
+    documento por ventanas de ``QUESTION_BANK_WINDOW`` páginas. Las ventanas
+    que ya tienen preguntas (p. ej. copiadas de un duplicado) se omiten.
     """
-    logger.info("Starting Exam creation for exam: %s", exam_id)
+    if not settings.QUESTION_BANK_ENABLED or not document.num_pages:
+        return 0
+
+    existing = set(
+        BankQuestion.objects.filter(document_id=document.id)
+        .values_list("page_start", "page_end")
+        .distinct()
+    )
+    window = settings.QUESTION_BANK_WINDOW
+    windows = 0
+    for page_start in range(1, document.num_pages + 1, window):
+        page_end = min(page_start + window - 1, document.num_pages)
+        if (page_start, page_end) in existing:
+            continue
+        pregenerate_bank_window(document.id, page_start, page_end)
+        windows += 1
+    logger.info("Queued %d question bank windows for document %s", windows, document.id)
+    return windows
+
+
+@db_task(priority=settings.QUESTION_BANK_PRIORITY)
+def pregenerate_bank_window(document_id, page_start, page_end):
+    """
+    Genera las preguntas del banco para una ventana de páginas. Corre con
+    prioridad baja: las tareas que espera un usuario salen antes de la cola.
 
+    Un lock en Redis por ventana evita que dos workers (p. ej. un documento
+    encolado dos veces) generen e inserten la misma ventana a la vez; la
+    comprobación de filas existentes se hace ya con el lock tomado.
+    """
+    lock = get_redis().lock(
+        f"exams:bank:lock:{document_id}:{page_start}-{page_end}",
+        timeout=settings.QUESTION_BANK_LOCK_TIMEOUT,
+        blocking=False,
+    )
+    if not lock.acquire():
+        return {"status": "locked", "document_id": document_id}
     try:
-        exam = Exam.objects.get(id=exam_id)
-        exam.status = "process"
-        exam.save()
-
-        blocks = Block.objects.filter(
-            document=document_id, page__gte=page_start, page__lte=page_end
-        ).order_by("page")
-
-        if not blocks.exists():
-            logger.error("No blocks found for document: %s", document_id)
-            exam.status = "fail"
-            exam.save()
-            raise Exception("No content found for the selected pages")
-
-        base_text = "\n\n".join([f"Página {b.page}: {b.content}" for b in blocks])
-        print(base_text)
-        generador = GeneradorExamenes()
-        preguntas_generadas = generador.generate(
-            base_text=base_text, total_questions=exam.num_questions
-        )
-        questions_to_create = []
-        for p in preguntas_generadas["questions"]:
-            questions_to_create.append(
-                Question(
-                    exam=exam,
-                    question=p["question"],
-                    options=p["options"],
-                    difficulty=p["difficulty"],
-                )
+        return _pregenerate_bank_window(document_id, page_start, page_end)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # Expiró antes de terminar: otro worker pudo tomarlo
+            logger.warning(
+                "Question bank lock expired for document %s pages %d-%d",
+                document_id,
+                page_start,
+                page_end,
             )
-        if questions_to_create:
-            Question.objects.bulk_create(questions_to_create)
 
-        exam.status = "done"
-        exam.save()
 
-        logger.info(
-            "Exam %s completed with %d questions.", exam_id, len(questions_to_create)
-        )
-
-        return {
-            "status": "success",
-            "exam_id": exam_id,
-            "questions_count": len(questions_to_create),
-        }
-
-    except Exam.DoesNotExist:
-        logger.error("Exam not found: %s", exam_id)
-        raise
-    except Exception as exc:
-        logger.error("Error creating exam %s: %s", exam_id, exc)
-        if "exam" in locals():
-            exam.status = "fail"
-            exam.save()
-        raise
+def _pregenerate_bank_window(document_id, page_start, page_end):
+    window = BankQuestion.objects.filter(
+        document_id=document_id, page_start=page_start, page_end=page_end
+    )
+    if window.exists():
+        return {"status": "skipped", "document_id": document_id}
+
+    base_text = get_page_range_text(document_id, page_start, page_end)
+    if not base_text:
+        return {"status": "empty", "document_id": document_id}
+
+    user_id = (
+        Document.objects.filter(id=document_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    with usage_context(user_id=user_id, endpoint="bank.pregenerate"):
+        result = generate_questions(base_text, settings.QUESTION_BANK_PER_WINDOW)
+
+    questions = BankQuestion.objects.bulk_create(
+        [
+            BankQuestion(
+                document_id=document_id,
+                page_start=page_start,
+                page_end=page_end,
+                question=q["question"],
+                options=q["options"],
+                difficulty=translate_difficulty(q["difficulty"]),
+            )
+            for q in result.get("questions", [])
+        ]
+    )
+    logger.info(
+        "Question bank: %d questions for document %s pages %d-%d",
+        len(questions),
+        document_id,
+        page_start,
+        page_end,
+    )
+    return {"status": "success", "questions_count": len(questions)}
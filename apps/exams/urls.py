@@ -1,10 +1,15 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework.routers import DefaultRouter
 
 from apps.exams.views import (
     ListExamView,
+    StreamExamView,
+    GenerateExamView,
     DetailExamView,
+    ExamStatusView,
+    TakeExamView,
     UpdateExamResultView,
     CreateExamAttemptView,
     ListExamAttemptsView,
@@ -15,7 +20,12 @@ router = DefaultRouter()
 
 urlpatterns = [
     path("exams/", ListExamView.as_view()),
+    path("exams/stream/", StreamExamView.as_view()),
+    # Vista async (ASGI); autentica por su cuenta, sin sesión ni CSRF
+    path("exams/generate/", csrf_exempt(GenerateExamView.as_view())),
     path("exams/<int:pk>", DetailExamView.as_view()),
+    path("exams/<int:pk>/status/", ExamStatusView.as_view()),
+    path("exams/<int:pk>/take/", TakeExamView.as_view()),
     path("exams/<int:exam_id>/attempts/", CreateExamAttemptView.as_view()),
     path("exams/attempts/", ListExamAttemptsView.as_view()),
     path("exams/failures/", CreateFailureExamView.as_view()),
@@ -1,11 +1,30 @@
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
-from groq import Groq
+from django.core.serializers.json import DjangoJSONEncoder
+import asyncio
+import contextvars
+import copy
+import difflib
+import hashlib
 import json
+import logging
+import random
 import uuid
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from apps.exams.providers import get_provider, usage_context
+from apps.exams.streaming import QuestionStreamParser
+from django.db.models import Count, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+from core.cache import TwoTierCache
+from core.websocket import notify_user
 
-groq = Groq(
-    api_key=settings.GROQ_API_KEY,
+logger = logging.getLogger(__name__)
+
+exam_cache = TwoTierCache("exam", version=2)
+generation_cache = TwoTierCache(
+    "generation",
+    timeout=settings.GENERATION_CACHE_TIMEOUT,
+    local_maxsize=settings.GENERATION_CACHE_LOCAL_MAXSIZE,
 )
 
 PROMPT = """
@@ -13,14 +32,355 @@ Genera {num_questions} preguntas apartir de este texto que te de el usuario.
 las preguntas deben de estar generadas en espanol y cada pregunta debe de tener 4 opciones, una correcta y 3 incorrectas.
 """
 
+# Subir al cambiar PROMPT o el schema: invalida las respuestas en caché
+PROMPT_VERSION = 3
+
+DIFFICULTY_PROMPT = """
+Reparte las dificultades exactamente así: {distribution}.
+"""
+
+# El modo streaming no admite json_schema: el formato va en el prompt
+STREAM_FORMAT_PROMPT = """
+Responde únicamente con un objeto JSON con esta forma, sin texto adicional:
+{"questions": [{"question": "...", "options": [{"text": "...", "isCorrect": true}], "difficulty": "easy"}]}
+difficulty debe ser "easy", "medium" o "hard".
+"""
+
+# Dificultades que se reparten (en partes iguales) entre todos los lotes
+BATCH_DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def generation_cache_key(base_text, num_questions, model=None):
+    """Hash del contexto, número de preguntas, modelo y versión del prompt"""
+    model = model or get_provider().cache_key
+    digest = hashlib.sha256()
+    for part in (str(PROMPT_VERSION), model, str(num_questions), base_text):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def reissue_option_ids(result):
+    """
+    Copia de ``result`` con ids nuevos en todas las opciones, para que dos
+    exámenes que reutilizan la misma generación no compartan ids.
+    """
+    result = copy.deepcopy(result)
+    for question in result.get("questions", []):
+        for option in question.get("options", []):
+            option["id"] = str(uuid.uuid4())
+    return result
+
+
+def is_complete_generation(result, num_questions):
+    """
+    True si ``result`` trae exactamente ``num_questions`` preguntas bien
+    formadas (enunciado y opciones con una sola correcta). Solo esas
+    generaciones se guardan: una respuesta corta o incompleta se serviría
+    desde la caché hasta que expire.
+    """
+    if not isinstance(result, dict):
+        return False
+    questions = result.get("questions")
+    if not isinstance(questions, list) or len(questions) != int(num_questions):
+        return False
+    for question in questions:
+        if not isinstance(question, dict) or not question.get("question"):
+            return False
+        options = question.get("options")
+        if not isinstance(options, list) or not options:
+            return False
+        if sum(1 for option in options if option.get("isCorrect") is True) != 1:
+            return False
+    return True
+
+
+def generate_questions(base_text, num_questions, fresh=False):
+    """
+    Genera preguntas con el proveedor LLM configurado. Las respuestas se guardan en
+    ``generation_cache``; con ``fresh=True`` se ignora la caché y se pide una
+    generación nueva (que reemplaza a la guardada).
+    """
+    key = generation_cache_key(base_text, num_questions)
+    if not fresh:
+        cached = generation_cache.get(key)
+        if cached is not None:
+            logger.info(f"✅ [LLM] Generation cache hit {key[:12]}")
+            return reissue_option_ids(cached)
+
+    if int(num_questions) > settings.GENERATION_BATCH_SIZE:
+        result = _generate_in_batches(base_text, int(num_questions))
+    else:
+        result = _request_questions(base_text, num_questions)
+    if is_complete_generation(result, num_questions):
+        generation_cache.set(key, result)
+    else:
+        logger.warning(f"⚠️  [LLM] Incomplete generation {key[:12]} not cached")
+    return reissue_option_ids(result)
+
+
+async def agenerate_questions(base_text, num_questions, fresh=False):
+    """
+    Versión async de ``generate_questions`` para vistas ASGI: las llamadas
+    (y los lotes concurrentes) esperan en el event loop, sin un hilo por
+    petición.
+    """
+    key = generation_cache_key(base_text, num_questions)
+    if not fresh:
+        cached = await sync_to_async(generation_cache.get, thread_sensitive=False)(key)
+        if cached is not None:
+            logger.info(f"✅ [LLM] Generation cache hit {key[:12]}")
+            return reissue_option_ids(cached)
+
+    if int(num_questions) > settings.GENERATION_BATCH_SIZE:
+        result = await _agenerate_in_batches(base_text, int(num_questions))
+    else:
+        result = await _arequest_questions(base_text, num_questions)
+    if is_complete_generation(result, num_questions):
+        await sync_to_async(generation_cache.set, thread_sensitive=False)(key, result)
+    else:
+        logger.warning(f"⚠️  [LLM] Incomplete generation {key[:12]} not cached")
+    return reissue_option_ids(result)
+
+
+async def astream_questions(base_text, num_questions, fresh=False, attribution=None):
+    """
+    Como ``agenerate_questions`` pero como generador async: entrega cada
+    pregunta (con ids de opción ya asignados) en cuanto el modelo termina de
+    escribirla. La generación se guarda en ``generation_cache`` solo si el
+    stream se consumió hasta el final y trajo todas las preguntas.
+    ``attribution`` reemplaza a ``usage_context`` para registrar el uso.
+    """
+    key = generation_cache_key(base_text, num_questions)
+    if not fresh:
+        cached = await sync_to_async(generation_cache.get, thread_sensitive=False)(key)
+        if cached is not None:
+            logger.info(f"✅ [LLM] Generation cache hit {key[:12]}")
+            for question in reissue_option_ids(cached)["questions"]:
+                yield question
+            return
+
+    parser = QuestionStreamParser()
+    questions = []
+    async with get_provider().astream(
+        messages=[
+            {
+                "role": "system",
+                "content": PROMPT.format(num_questions=num_questions)
+                + STREAM_FORMAT_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": base_text,
+            },
+        ],
+        response_format={"type": "json_object"},
+        attribution=attribution,
+    ) as fragments:
+        async for fragment in fragments:
+            for question in parser.feed(fragment):
+                questions.append(question)
+                yield reissue_option_ids({"questions": [question]})["questions"][0]
+
+    result = {"questions": questions}
+    if is_complete_generation(result, num_questions):
+        await sync_to_async(generation_cache.set, thread_sensitive=False)(key, result)
+    else:
+        logger.warning(f"⚠️  [LLM] Incomplete generation {key[:12]} not cached")
+
+
+def split_batches(num_questions, batch_size):
+    """
+    Reparte ``num_questions`` en lotes de a lo más ``batch_size`` lo más
+    parejos posible, p. ej. 12 en lotes de 5 → [4, 4, 4].
+    """
+    num_batches = -(-num_questions // batch_size)
+    base, extra = divmod(num_questions, num_batches)
+    return [base + 1 if i < extra else base for i in range(num_batches)]
+
+
+def _normalize_question(text):
+    return " ".join(text.lower().split())
+
+
+def _is_near_duplicate(question, seen):
+    text = _normalize_question(question["question"])
+    return any(
+        difflib.SequenceMatcher(None, text, other).ratio()
+        >= settings.GENERATION_DEDUP_THRESHOLD
+        for other in seen
+    )
+
+
+def _merge_questions(batches, seen, limit):
+    """Agrega preguntas de los lotes en orden, saltando casi-duplicados"""
+    merged = []
+    for questions in batches:
+        for question in questions:
+            if len(merged) >= limit:
+                return merged
+            if _is_near_duplicate(question, seen):
+                continue
+            seen.append(_normalize_question(question["question"]))
+            merged.append(question)
+    return merged
+
+
+def _generate_in_batches(base_text, num_questions):
+    """
+    Divide la generación en lotes concurrentes, cada uno con su cuota de
+    preguntas por dificultad: la latencia pasa a ser la del lote más lento
+    en vez de la de una sola respuesta larga. Los resultados se unen sin casi-duplicados y
+    si faltan preguntas se pide un lote más para completarlas.
+    """
+    sizes, quotas = _batch_plan(num_questions)
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(sizes), settings.GENERATION_MAX_CONCURRENCY),
+        thread_name_prefix="llm-batch",
+    ) as executor:
+        futures = [
+            # Cada lote conserva el usage_context de quien lo pidió
+            executor.submit(
+                contextvars.copy_context().run,
+                _request_questions,
+                base_text,
+                size,
+                quota,
+            )
+            for size, quota in zip(sizes, quotas)
+        ]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    questions, seen = _merge_batch_results(results, num_questions)
+
+    missing = num_questions - len(questions)
+    if missing > 0:
+        logger.info(f"✅ [LLM] Topping up {missing} questions after merge")
+        try:
+            extra = _request_questions(base_text, missing)
+            questions += _merge_questions([extra.get("questions", [])], seen, missing)
+        except Exception as e:
+            logger.warning(f"⚠️  [LLM] Top-up batch failed: {e}")
+
+    return _batch_result(questions, num_questions)
+
+
+async def _agenerate_in_batches(base_text, num_questions):
+    """Como ``_generate_in_batches`` pero con los lotes en el event loop"""
+    sizes, quotas = _batch_plan(num_questions)
+    results = await asyncio.gather(
+        *(
+            _arequest_questions(base_text, size, quota)
+            for size, quota in zip(sizes, quotas)
+        ),
+        return_exceptions=True,
+    )
+    questions, seen = _merge_batch_results(results, num_questions)
+
+    missing = num_questions - len(questions)
+    if missing > 0:
+        logger.info(f"✅ [LLM] Topping up {missing} questions after merge")
+        try:
+            extra = await _arequest_questions(base_text, missing)
+            questions += _merge_questions([extra.get("questions", [])], seen, missing)
+        except Exception as e:
+            logger.warning(f"⚠️  [LLM] Top-up batch failed: {e}")
+
+    return _batch_result(questions, num_questions)
+
+
+def _batch_result(questions, num_questions):
+    # Un resultado corto se entrega igual, pero is_complete_generation evita
+    # que se guarde en generation_cache
+    if len(questions) < num_questions:
+        logger.warning(
+            f"⚠️  [LLM] Batches returned {len(questions)} of {num_questions} questions"
+        )
+    return {"questions": questions}
+
+
+def _batch_plan(num_questions):
+    """
+    Tamaños de los lotes y la cuota por dificultad de cada uno. Las
+    dificultades se reparten en partes iguales sobre todo el examen,
+    intercaladas entre lotes: 10 en lotes de 5 → {easy: 2, medium: 2,
+    hard: 1} y {easy: 2, medium: 1, hard: 2}.
+    """
+    sizes = split_batches(num_questions, settings.GENERATION_BATCH_SIZE)
+    order = [
+        BATCH_DIFFICULTIES[i % len(BATCH_DIFFICULTIES)] for i in range(num_questions)
+    ]
+    quotas = []
+    start = 0
+    for size in sizes:
+        quota = {}
+        for difficulty in order[start : start + size]:
+            quota[difficulty] = quota.get(difficulty, 0) + 1
+        quotas.append(quota)
+        start += size
+    return sizes, quotas
+
+
+def _merge_batch_results(results, num_questions):
+    """
+    Une los resultados de los lotes (respuestas o excepciones). Falla solo
+    si fallaron todos.
+    """
+    batches = []
+    errors = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"⚠️  [LLM] Generation batch failed: {result}")
+            errors.append(result)
+        else:
+            batches.append(result.get("questions", []))
+    if not batches:
+        raise errors[0]
+
+    seen = []
+    return _merge_questions(batches, seen, num_questions), seen
+
+
+def _request_questions(base_text, num_questions, difficulties=None):
+    content = get_provider().complete(
+        **_question_request(base_text, num_questions, difficulties)
+    )
+    return json.loads(content or "{}")
+
 
-def generate_questions(base_text, num_questions):
-    response = groq.chat.completions.create(
-        model="openai/gpt-oss-20b",
+async def _arequest_questions(base_text, num_questions, difficulties=None):
+    content = await get_provider().acomplete(
+        **_question_request(base_text, num_questions, difficulties)
+    )
+    return json.loads(content or "{}")
+
+
+def _question_request(base_text, num_questions, difficulties=None):
+    """
+    Mensajes y formato de respuesta para generar preguntas. ``difficulties``
+    (``{"easy": n, ...}``) fija cuántas de cada dificultad; sin él el modelo
+    elige la mezcla.
+    """
+    system_prompt = PROMPT.format(num_questions=num_questions)
+    if difficulties:
+        system_prompt += DIFFICULTY_PROMPT.format(
+            distribution=", ".join(
+                f"{count} de dificultad {difficulty}"
+                for difficulty, count in difficulties.items()
+            )
+        )
+
+    return dict(
         messages=[
             {
                 "role": "system",
-                "content": PROMPT.format(num_questions=num_questions),
+                "content": system_prompt,
             },
             {
                 "role": "user",
@@ -82,62 +442,344 @@ def generate_questions(base_text, num_questions):
         },
     )
 
-    result = json.loads(response.choices[0].message.content or "{}")
 
-    for question in result.get("questions", []):
-        for option in question.get("options", []):
-            if "id" not in option:
-                option["id"] = str(uuid.uuid4())
+def get_exam_with_questions(exam_id):
+    """
+    Retorna ``{"exam": ..., "questions": [...]}`` serializados desde la caché,
+    o None si el examen no existe.
+    """
+    from apps.exams.models import Exam
+    from apps.exams.serializers import ExamSerializer, QuestionSerializer
 
-    return result
+    def load():
+        exam = Exam.objects.filter(id=exam_id).first()
+        if exam is None:
+            return None
+        return {
+            "exam": dict(ExamSerializer(exam).data),
+            "questions": [
+                dict(QuestionSerializer(q).data) for q in exam.get_questions()
+            ],
+        }
 
+    return exam_cache.get_or_set(exam_id, load)
 
-def calculate_score(exam, answers):
-    correct = 0
-    for question in exam.questions.all():
-        selected_option_id = answers.get(str(question.id))
-        if not selected_option_id:
-            continue
 
-        for option in question.options:
-            if option["id"] == selected_option_id and option["isCorrect"]:
-                correct += 1
-                break
+def get_exam_for_taking(exam_id):
+    """
+    Examen con sus preguntas para responderlo, sin las respuestas correctas:
+    ``{"exam": ..., "questions": [...], "etag": ...}`` desde la caché, o None
+    si el examen no existe. El ETag se calcula al llenar la caché.
+    """
+    from apps.exams.models import Exam
+    from apps.exams.serializers import ExamSerializer
+
+    def load():
+        exam = Exam.objects.filter(id=exam_id).first()
+        if exam is None:
+            return None
+        questions = exam.get_questions().only("id", "question", "options", "difficulty")
+        payload = {
+            "exam": dict(ExamSerializer(exam).data),
+            "questions": [
+                {
+                    "id": q.id,
+                    "question": q.question,
+                    "options": [
+                        {"id": o.get("id"), "text": o.get("text")} for o in q.options
+                    ],
+                    "difficulty": reverse_translate_difficulty(q.difficulty),
+                }
+                for q in questions
+            ],
+        }
+        body = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder)
+        payload["etag"] = hashlib.sha1(body.encode()).hexdigest()
+        return payload
 
-    total = exam.questions.count()
-    return correct, total
+    return exam_cache.get_or_set(f"take:{exam_id}", load)
 
 
-def get_failed_questions(user_id, start_date, end_date, limit=20):
-    from apps.exams.models import ExamAttempt
+def invalidate_exam_cache(exam_id):
+    """Descarta el detalle y la versión para responder del examen"""
+    exam_cache.delete(exam_id)
+    exam_cache.delete(f"take:{exam_id}")
+
+
+def notify_exam_status(exam, status, questions=None):
+    """Empuja el estado de generación del examen por WebSocket al dueño"""
+    data = {"exam_id": exam.id, "document_id": exam.document_id, "status": status}
+    if questions is not None:
+        data["questions"] = questions
+    notify_user(exam.user_id, "exam.status", data)
+
+
+async def agenerate_exam_questions(
+    exam, base_text, fresh=False, endpoint="exams.create", generate=None
+):
+    """
+    Arma las preguntas de ``exam``: desde el banco pre-generado si alcanza
+    (salvo con ``fresh``) o generándolas con IA, recorriendo su ciclo de
+    estados (processing → done/failed) y notificando cada cambio. Retorna
+    las preguntas tal como se guardaron.
 
-    attempts = (
-        ExamAttempt.objects.filter(
-            user_id=user_id, completed_at__gte=start_date, completed_at__lte=end_date
+    Es el único camino de generación: las vistas async lo esperan
+    directamente y el código síncrono pasa por ``generate_exam_questions``.
+    ``generate`` reemplaza a ``agenerate_questions``.
+    """
+    from apps.exams.models import Exam
+
+    if not fresh:
+        questions = await sync_to_async(fill_exam_from_bank)(exam)
+        if questions is not None:
+            return questions
+
+    generate = generate or agenerate_questions
+    await sync_to_async(_advance_exam)(exam, Exam.STATUS_PROCESSING)
+    try:
+        with usage_context(user_id=exam.user_id, exam_id=exam.id, endpoint=endpoint):
+            result = await generate(base_text, exam.num_questions, fresh=fresh)
+        questions = result.get("questions", [])
+        await sync_to_async(save_generated_questions)(exam, questions)
+    except Exception as e:
+        await sync_to_async(_advance_exam)(exam, Exam.STATUS_FAILED, error=str(e))
+        raise
+
+    await sync_to_async(_advance_exam)(exam, Exam.STATUS_DONE, questions=questions)
+    return questions
+
+
+def generate_exam_questions(exam, base_text, fresh=False, endpoint="exams.create"):
+    """
+    Versión síncrona de ``agenerate_exam_questions`` (Huey, vistas DRF): la
+    llamada al LLM usa el cliente síncrono del proceso en un hilo, así no
+    se abre un cliente async por cada event loop temporal.
+    """
+    return async_to_sync(agenerate_exam_questions)(
+        exam,
+        base_text,
+        fresh=fresh,
+        endpoint=endpoint,
+        generate=sync_to_async(generate_questions, thread_sensitive=False),
+    )
+
+
+def _advance_exam(exam, status, error="", questions=None):
+    exam.set_status(status, error=error)
+    notify_exam_status(exam, exam.status, questions)
+
+
+def save_generated_questions(exam, questions):
+    """Persiste las preguntas generadas por el modelo para ``exam``"""
+    from apps.exams.models import Question
+
+    questions_to_create = [
+        Question(
+            exam=exam,
+            question=q["question"],
+            options=q["options"],
+            difficulty=translate_difficulty(q["difficulty"]),
         )
-        .select_related("exam")
-        .prefetch_related("exam__questions")
+        for q in questions
+    ]
+    if questions_to_create:
+        Question.objects.bulk_create(questions_to_create)
+    exam.refresh_answer_key(questions_to_create)
+    # bulk_create no dispara las señales que limpian la caché
+    invalidate_exam_cache(exam.id)
+
+
+def sample_question_bank(document_id, page_start, page_end, num_questions):
+    """
+    Toma ``num_questions`` preguntas del banco pre-generado cuyas ventanas
+    caen dentro de [page_start, page_end], alternando dificultades. Retorna
+    None si el banco no alcanza.
+    """
+    from apps.exams.models import BankQuestion
+
+    candidates = list(
+        BankQuestion.objects.filter(
+            document_id=document_id,
+            page_start__gte=page_start,
+            page_end__lte=page_end,
+        ).values("question", "options", "difficulty")
     )
+    if len(candidates) < num_questions:
+        return None
 
-    failed_counter = Counter()
+    random.shuffle(candidates)
+    pools = {}
+    for candidate in candidates:
+        pools.setdefault(candidate["difficulty"], []).append(candidate)
 
-    for attempt in attempts:
-        for question in attempt.exam.questions.all():
-            selected_option_id = attempt.answers.get(str(question.id))
-            if not selected_option_id:
-                failed_counter[question] += 1
-                continue
+    picked = []
+    while len(picked) < num_questions:
+        for pool in pools.values():
+            if pool and len(picked) < num_questions:
+                picked.append(pool.pop())
+
+    return reissue_option_ids(
+        {
+            "questions": [
+                {
+                    "question": q["question"],
+                    "options": q["options"],
+                    "difficulty": reverse_translate_difficulty(q["difficulty"]),
+                }
+                for q in picked
+            ]
+        }
+    )["questions"]
 
-            is_correct = any(
-                opt["id"] == selected_option_id and opt["isCorrect"]
-                for opt in question.options
+
+def copy_question_bank(source, target):
+    """
+    Copia a ``target`` el banco de preguntas de ``source`` (mismo contenido),
+    sin volver a generarlo. Retorna el número de preguntas copiadas.
+    """
+    from apps.exams.models import BankQuestion
+
+    rows = BankQuestion.objects.filter(document=source).values(
+        "page_start", "page_end", "question", "options", "difficulty"
+    )
+    copied = BankQuestion.objects.bulk_create(
+        [BankQuestion(document=target, **row) for row in rows]
+    )
+    return len(copied)
+
+
+def fill_exam_from_bank(exam):
+    """
+    Arma el examen con preguntas del banco, sin LLM. Retorna las preguntas o
+    None si no hay suficientes y hay que generarlas en vivo.
+    """
+    from apps.exams.models import Exam
+
+    questions = sample_question_bank(
+        exam.document_id, exam.page_start, exam.page_end, exam.num_questions
+    )
+    if questions is None:
+        return None
+
+    save_generated_questions(exam, questions)
+    exam.set_status(Exam.STATUS_DONE)
+    notify_exam_status(exam, exam.status, questions)
+    return questions
+
+
+def notify_exam_question(exam, question):
+    """Empuja por WebSocket una pregunta recién generada en modo streaming"""
+    notify_user(exam.user_id, "exam.question", {"exam_id": exam.id, **question})
+
+
+def calculate_score(exam, answers):
+    """Puntaje con la clave de respuestas precalculada: sin consultas extra"""
+    answer_key = exam.answer_key or exam.refresh_answer_key()
+    correct = sum(
+        1
+        for question_id, option_id in answer_key["answers"].items()
+        if option_id is not None and answers.get(question_id) == option_id
+    )
+    return correct, answer_key["total"]
+
+
+def build_answer_outcomes(attempt):
+    """
+    Filas de ``AnswerOutcome`` (sin guardar) del intento, una por pregunta
+    de la clave de respuestas; una pregunta sin responder cuenta como fallo.
+    """
+    from apps.exams.models import AnswerOutcome
+
+    answer_key = attempt.exam.answer_key or attempt.exam.refresh_answer_key()
+    outcomes = []
+    for question_id, option_id in answer_key["answers"].items():
+        selected_option_id = attempt.answers.get(question_id) or ""
+        outcomes.append(
+            AnswerOutcome(
+                attempt_id=attempt.id,
+                question_id=int(question_id),
+                user_id=attempt.user_id,
+                selected_option=str(selected_option_id),
+                is_correct=option_id is not None and selected_option_id == option_id,
+                completed_at=attempt.completed_at,
             )
+        )
+    return outcomes
+
+
+def record_answer_outcomes(attempt):
+    """Guarda las filas por pregunta del intento en un solo INSERT"""
+    from apps.exams.models import AnswerOutcome
+
+    return AnswerOutcome.objects.bulk_create(build_answer_outcomes(attempt))
 
-            if not is_correct:
-                failed_counter[question] += 1
 
-    most_failed = failed_counter.most_common(limit)
-    return [question for question, count in most_failed]
+def record_question_stats(attempt, outcomes):
+    """
+    Suma el intento a las estadísticas por pregunta del usuario: crea las
+    filas que falten y actualiza contadores con F() en dos UPDATE. Debe
+    llamarse dentro de la misma transacción que crea el intento.
+    """
+    from apps.exams.models import QuestionStat
+
+    question_ids = [outcome.question_id for outcome in outcomes]
+    if not question_ids:
+        return
+    missed_ids = [outcome.question_id for outcome in outcomes if not outcome.is_correct]
+
+    QuestionStat.objects.bulk_create(
+        [
+            QuestionStat(user_id=attempt.user_id, question_id=question_id)
+            for question_id in question_ids
+        ],
+        ignore_conflicts=True,
+    )
+    stats = QuestionStat.objects.filter(user_id=attempt.user_id)
+    completed_at = Value(attempt.completed_at)
+    stats.filter(question_id__in=question_ids).update(
+        attempts=F("attempts") + 1,
+        last_attempted_at=Greatest(
+            Coalesce("last_attempted_at", completed_at), completed_at
+        ),
+    )
+    if missed_ids:
+        stats.filter(question_id__in=missed_ids).update(
+            misses=F("misses") + 1,
+            last_missed_at=Greatest(
+                Coalesce("last_missed_at", completed_at), completed_at
+            ),
+        )
+
+
+def get_failed_questions(user_id, start_date=None, end_date=None, limit=20):
+    """
+    Preguntas más falladas por el usuario (sin responder cuenta como fallo);
+    los empates se ordenan por el fallo más reciente. Sin periodo se leen
+    de ``QuestionStat`` con un solo ORDER BY sobre su índice; con periodo se
+    agregan en SQL los ``AnswerOutcome`` del rango.
+    """
+    from apps.exams.models import AnswerOutcome, Question, QuestionStat
+
+    if start_date is None and end_date is None:
+        question_ids = list(
+            QuestionStat.objects.filter(user_id=user_id, misses__gt=0)
+            .order_by("-misses", "-last_missed_at")
+            .values_list("question_id", flat=True)[:limit]
+        )
+    else:
+        outcomes = AnswerOutcome.objects.filter(user_id=user_id, is_correct=False)
+        if start_date is not None:
+            outcomes = outcomes.filter(completed_at__gte=start_date)
+        if end_date is not None:
+            outcomes = outcomes.filter(completed_at__lte=end_date)
+        rows = (
+            outcomes.values("question_id")
+            .annotate(misses=Count("id"), last_missed_at=Max("completed_at"))
+            .order_by("-misses", "-last_missed_at")[:limit]
+        )
+        question_ids = [row["question_id"] for row in rows]
+    questions = Question.objects.select_related("exam__document").in_bulk(question_ids)
+    return [questions[question_id] for question_id in question_ids]
 
 
 def translate_difficulty(english_difficulty: str) -> str:
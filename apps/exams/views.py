@@ -1,42 +1,107 @@
 from rest_framework.generics import (
     ListAPIView,
+    RetrieveAPIView,
     RetrieveUpdateDestroyAPIView,
     UpdateAPIView,
     CreateAPIView,
 )
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
-from apps.exams.models import Exam, ExamAttempt, Question
+from rest_framework.views import APIView
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+import asyncio
+import json
+from core.pagination import KeysetPagination
+from core.response_cache import CachedResponseMixin
+from apps.exams.models import Exam, ExamAttempt, ExamQuestion, Question
 from apps.exams import serializers
 from rest_framework.response import Response
 from rest_framework import status
-from apps.documents.models import Block
+from rest_framework.exceptions import NotFound
+from apps.documents.utils import get_page_range_text
 from django_filters.rest_framework import DjangoFilterBackend
 import logging
+from apps.exams.tasks import create_exam
+from apps.exams.llm import LLMBusy
+from apps.exams.signals import attempt_recorded
+from apps.exams.streaming import sse_event
 from apps.exams.utils import (
-    generate_questions,
+    agenerate_exam_questions,
+    fill_exam_from_bank,
+    generate_exam_questions,
+    get_exam_for_taking,
+    get_exam_with_questions,
+    notify_exam_question,
+    notify_exam_status,
+    record_answer_outcomes,
+    record_question_stats,
+    astream_questions,
+    translate_difficulty,
     calculate_score,
     get_failed_questions,
-    translate_difficulty,
     reverse_translate_difficulty,
 )
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
 # Se recomienda usar el nombre del módulo (__name__) o el string que definiste
 logger = logging.getLogger(__name__)
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
+def get_exam_base_text(document, page_start, page_end):
+    """
+    Valida el rango de páginas pedido y arma el texto base del examen.
+    Retorna ``(base_text, None)`` o ``(None, Response)`` con el error.
+    """
+    if page_start > page_end:
+        return None, Response(
+            {"error": "page_start must be less than page_end"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if page_end - page_start > 10:
+        return None, Response(
+            {"error": "Maximimum number of pages is 10"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if not document.pages_available(page_end):
+        return None, Response(
+            {
+                "error": "Pages not extracted yet",
+                "status": document.status,
+                "pages_done": document.pages_done,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    base_text = get_page_range_text(document.id, page_start, page_end)
+    if not base_text:
+        return None, Response(
+            {"error": "No blocks found for document"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return base_text, None
+
 
+def llm_busy_response(error):
+    return Response(
+        {"error": str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(settings.LLM_ACQUIRE_TIMEOUT)},
+    )
 
-class ListExamView(ListAPIView):
+
+class ListExamView(CachedResponseMixin, ListAPIView):
     allowed_methods = ["GET", "POST"]
     serializer_class = serializers.ExamSerializer
     # permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
+    ordering = ("-created_at", "-id")
     filter_backends = [DjangoFilterBackend]
     filterset_fields = {
         "document": ["exact"],
@@ -45,7 +110,7 @@ class ListExamView(ListAPIView):
 
     def get_queryset(self):
         """Solo exámenes del usuario autenticado"""
-        return Exam.objects.filter(user=self.request.user).order_by("-created_at")
+        return Exam.objects.filter(user=self.request.user)
 
     @extend_schema(
         request=serializers.ExamSerializer,
@@ -54,12 +119,36 @@ class ListExamView(ListAPIView):
                 response=serializers.ExamCreationResponseSerializer,
                 description="Exam created successfully with generated questions"
             ),
+            202: OpenApiResponse(
+                response=serializers.ExamQueuedResponseSerializer,
+                description="Exam queued for generation (?async=true)"
+            ),
             400: OpenApiResponse(description="Bad request - validation error"),
             404: OpenApiResponse(description="No blocks found for document"),
+            503: OpenApiResponse(description="Too many generations in progress, retry later"),
         },
+        parameters=[
+            OpenApiParameter(
+                "async",
+                bool,
+                description="Queue the generation and return 202 immediately",
+            ),
+            OpenApiParameter(
+                "fresh",
+                bool,
+                description=(
+                    "Skip the question bank and the generation cache and ask "
+                    "the model for new questions"
+                ),
+            ),
+        ],
         description=(
             "Create a new exam by generating AI-powered questions from document pages. "
-            "The exam and questions are saved to the database and returned in the response."
+            "When the pre-generated question bank covers the range, the exam is "
+            "assembled from it instantly. "
+            "The exam and questions are saved to the database and returned in the response. "
+            "With ?async=true the exam is queued and its progress can be polled at "
+            "/api/exams/{id}/status/ or followed over the status WebSocket."
         ),
     )
     def post(self, request, *args, **kwargs):
@@ -69,32 +158,10 @@ class ListExamView(ListAPIView):
         page_end = serializer.validated_data["page_end"]
         num_questions = serializer.validated_data["num_questions"]
 
-        # Validaciones existentes
-        if page_start > page_end:
-            return Response(
-                {"error": "page_start must be less than page_end"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        if page_end - page_start > 10:
-            return Response(
-                {"error": "Maximimum number of pages is 10"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        blocks = Block.objects.filter(
-            document=serializer.validated_data["document"],
-            page__gte=serializer.validated_data["page_start"],
-            page__lte=serializer.validated_data["page_end"],
-        ).order_by("page")
-
-        if not blocks.exists():
-            return Response(
-                {"error": "No blocks found for document"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
         document = serializer.validated_data["document"]
-        base_text = "\n\n".join([f"Página {b.page}: {b.content}" for b in blocks])
+        base_text, error_response = get_exam_base_text(document, page_start, page_end)
+        if error_response is not None:
+            return error_response
 
         # Crear examen
         exam = Exam(
@@ -106,34 +173,241 @@ class ListExamView(ListAPIView):
         )
         exam.save()
 
-        # Generar preguntas desde AI
-        result = generate_questions(base_text, num_questions)
-
-        # Persistir preguntas en la base de datos
-        questions_to_create = []
-        for q in result.get("questions", []):
-            questions_to_create.append(
-                Question(
-                    exam=exam,
-                    question=q["question"],
-                    options=q["options"],
-                    difficulty=translate_difficulty(q["difficulty"]),
+        # ?fresh=true pide preguntas nuevas aunque el rango ya esté en caché
+        fresh = request.query_params.get("fresh") in ("1", "true")
+
+        # Modo asíncrono: la generación corre en Huey y el cliente consulta
+        # /status/ o escucha el WebSocket. Si el banco pre-generado alcanza,
+        # el examen sale al momento sin encolar nada
+        if request.query_params.get("async") in ("1", "true"):
+            questions = None if fresh else fill_exam_from_bank(exam)
+            if questions is not None:
+                return Response(
+                    {
+                        "exam": serializers.ExamSerializer(exam).data,
+                        "questions": questions
+                    },
+                    status=status.HTTP_201_CREATED,
                 )
+            notify_exam_status(exam, exam.status)
+            create_exam(exam.id, fresh=fresh)
+            return Response(
+                {
+                    "exam": serializers.ExamSerializer(exam).data,
+                    "status_url": f"/api/exams/{exam.id}/status/",
+                },
+                status=status.HTTP_202_ACCEPTED,
             )
 
-        if questions_to_create:
-            Question.objects.bulk_create(questions_to_create)
+        # Armar desde el banco o generar con AI y persistir las preguntas
+        try:
+            questions = generate_exam_questions(exam, base_text, fresh=fresh)
+        except LLMBusy as e:
+            return llm_busy_response(e)
 
         # Preparar respuesta con exam + questions
         response_data = {
             "exam": serializers.ExamSerializer(exam).data,
-            "questions": result.get("questions", [])
+            "questions": questions
         }
 
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class DetailExamView(RetrieveUpdateDestroyAPIView):
+class StreamExamView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=serializers.ExamSerializer,
+        responses={
+            (200, "text/event-stream"): OpenApiResponse(
+                description=(
+                    "Server-Sent Events: `exam` (created exam), one `question` per "
+                    "generated question, then `done` or `error`"
+                )
+            ),
+            400: OpenApiResponse(description="Bad request - validation error"),
+            404: OpenApiResponse(description="No blocks found for document"),
+        },
+        parameters=[
+            OpenApiParameter(
+                "fresh",
+                bool,
+                description="Skip the generation cache and ask the model for new questions",
+            ),
+        ],
+        description=(
+            "Create an exam and stream its questions as the model writes them. "
+            "Each question is saved as soon as it is complete and also pushed "
+            "over the status WebSocket as `exam.question`."
+        ),
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.ExamSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        page_start = serializer.validated_data["page_start"]
+        page_end = serializer.validated_data["page_end"]
+
+        document = serializer.validated_data["document"]
+        base_text, error_response = get_exam_base_text(document, page_start, page_end)
+        if error_response is not None:
+            return error_response
+
+        exam = Exam.objects.create(
+            user=request.user,
+            document=document,
+            page_start=page_start,
+            page_end=page_end,
+            num_questions=serializer.validated_data["num_questions"],
+        )
+        fresh = request.query_params.get("fresh") in ("1", "true")
+
+        # Generador async: bajo ASGI cada evento sale en cuanto se produce
+        # (un generador síncrono se consumiría completo antes de enviarse)
+        response = StreamingHttpResponse(
+            self.stream(exam, base_text, fresh), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Evita que nginx acumule el stream antes de enviarlo
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, exam, base_text, fresh):
+        yield sse_event("exam", await sync_to_async(self.serialize)(exam))
+
+        await sync_to_async(self.set_status)(exam, Exam.STATUS_PROCESSING)
+
+        count = 0
+        # Los generadores no conservan contextvars entre yields: la
+        # atribución del uso se pasa explícita
+        attribution = {
+            "user_id": exam.user_id,
+            "exam_id": exam.id,
+            "endpoint": "exams.stream",
+        }
+        try:
+            async for generated in astream_questions(
+                base_text, exam.num_questions, fresh=fresh, attribution=attribution
+            ):
+                data = await sync_to_async(self.save_question)(exam, generated)
+                count += 1
+                yield sse_event("question", data)
+        except (asyncio.CancelledError, GeneratorExit):
+            # El cliente cerró la conexión: el examen queda con lo generado
+            await sync_to_async(self.set_status)(
+                exam, Exam.STATUS_FAILED, error="Stream closed by client"
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming exam {exam.id}: {e}")
+            await sync_to_async(self.set_status)(
+                exam, Exam.STATUS_FAILED, error=str(e)
+            )
+            yield sse_event("error", {"error": str(e)})
+            return
+
+        await sync_to_async(self.set_status)(exam, Exam.STATUS_DONE)
+        yield sse_event("done", {"exam_id": exam.id, "questions_count": count})
+
+    @staticmethod
+    def serialize(exam):
+        return serializers.ExamSerializer(exam).data
+
+    @staticmethod
+    def set_status(exam, exam_status, error=""):
+        exam.set_status(exam_status, error=error)
+        notify_exam_status(exam, exam.status)
+
+    @staticmethod
+    def save_question(exam, generated):
+        question = Question.objects.create(
+            exam=exam,
+            question=generated["question"],
+            options=generated["options"],
+            difficulty=translate_difficulty(generated["difficulty"]),
+        )
+        data = {"id": question.id, **generated}
+        notify_exam_question(exam, data)
+        return data
+
+
+def authenticate_request(request):
+    """Autentica una vista Django (no DRF) con las clases de autenticación de DRF"""
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+class GenerateExamView(View):
+    """
+    Igual que POST /api/exams/ pero como vista async: bajo ASGI la espera al
+    LLM ocurre en el event loop, así un mismo proceso atiende muchas
+    generaciones concurrentes sin ocupar un hilo por cada una.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        user = await sync_to_async(authenticate_request)(request)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse(
+                {"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = serializers.ExamSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        page_start = serializer.validated_data["page_start"]
+        page_end = serializer.validated_data["page_end"]
+
+        document = serializer.validated_data["document"]
+        base_text, error_response = await sync_to_async(get_exam_base_text)(
+            document, page_start, page_end
+        )
+        if error_response is not None:
+            return JsonResponse(error_response.data, status=error_response.status_code)
+
+        exam = await Exam.objects.acreate(
+            user=user,
+            document=document,
+            page_start=page_start,
+            page_end=page_end,
+            num_questions=serializer.validated_data["num_questions"],
+        )
+        fresh = request.GET.get("fresh") in ("1", "true")
+
+        try:
+            questions = await agenerate_exam_questions(
+                exam, base_text, fresh=fresh, endpoint="exams.generate"
+            )
+        except LLMBusy as e:
+            response = JsonResponse(
+                {"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response["Retry-After"] = str(settings.LLM_ACQUIRE_TIMEOUT)
+            return response
+
+        return JsonResponse(
+            {
+                "exam": serializers.ExamSerializer(exam).data,
+                "questions": questions,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class DetailExamView(CachedResponseMixin, RetrieveUpdateDestroyAPIView):
     allowed_methods = ["GET", "PUT", "DELETE"]
     serializer_class = serializers.ExamSerializer
     permission_classes = [IsAuthenticated]
@@ -142,6 +416,59 @@ class DetailExamView(RetrieveUpdateDestroyAPIView):
         """Solo exámenes del usuario autenticado"""
         return Exam.objects.filter(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, self.retrieve_exam, *args, **kwargs)
+
+    def retrieve_exam(self, request, *args, **kwargs):
+        """Detalle servido desde la caché de exámenes"""
+        cached = get_exam_with_questions(kwargs["pk"])
+        if cached is None or cached["exam"]["user"] != request.user.id:
+            raise NotFound()
+        return Response(cached["exam"])
+
+
+class TakeExamView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        responses={
+            200: serializers.TakeExamSerializer,
+            304: OpenApiResponse(description="Not modified (If-None-Match)"),
+            404: OpenApiResponse(description="Exam not found"),
+        },
+        description=(
+            "Exam with its questions for answering it, without the correct "
+            "answers. Send the returned ETag as If-None-Match to get a 304 "
+            "while the exam has not changed."
+        ),
+    )
+    def get(self, request, pk):
+        payload = get_exam_for_taking(pk)
+        if payload is None or payload["exam"]["user"] != request.user.id:
+            raise NotFound()
+
+        etag = quote_etag(payload["etag"])
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and etag in parse_etags(if_none_match):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(
+                {"exam": payload["exam"], "questions": payload["questions"]}
+            )
+        response["ETag"] = etag
+        # Cada cliente revalida con el ETag; nunca en cachés compartidas
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+class ExamStatusView(RetrieveAPIView):
+    serializer_class = serializers.ExamStatusSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Solo exámenes del usuario autenticado"""
+        return Exam.objects.filter(user=self.request.user)
+
 
 class UpdateExamResultView(UpdateAPIView):
     allowed_methods = ["PATCH"]
@@ -188,24 +515,31 @@ class CreateExamAttemptView(CreateAPIView):
 
         score, total_questions = calculate_score(exam, answers)
 
-        attempt = ExamAttempt.objects.create(
-            exam=exam,
-            user=request.user,
-            answers=answers,
-            score=score,
-            total_questions=total_questions,
-            started_at=started_at,
-            completed_at=completed_at,
-        )
+        with transaction.atomic():
+            attempt = ExamAttempt.objects.create(
+                exam=exam,
+                user=request.user,
+                answers=answers,
+                score=score,
+                total_questions=total_questions,
+                started_at=started_at,
+                completed_at=completed_at,
+            )
+            outcomes = record_answer_outcomes(attempt)
+            record_question_stats(attempt, outcomes)
+            attempt_recorded.send(
+                sender=ExamAttempt, attempt=attempt, outcomes=outcomes
+            )
 
         response_serializer = serializers.ExamAttemptSerializer(attempt)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ListExamAttemptsView(ListAPIView):
+class ListExamAttemptsView(CachedResponseMixin, ListAPIView):
     serializer_class = serializers.ExamAttemptSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
+    ordering = ("-completed_at", "-id")
     filter_backends = [DjangoFilterBackend]
     filterset_fields = {
         "completed_at": ["exact", "gte", "lte"],
@@ -214,9 +548,7 @@ class ListExamAttemptsView(ListAPIView):
 
     def get_queryset(self):
         """Solo intentos del usuario autenticado"""
-        return ExamAttempt.objects.filter(user=self.request.user).order_by(
-            "-completed_at"
-        )
+        return ExamAttempt.objects.filter(user=self.request.user)
 
 
 class CreateFailureExamView(CreateAPIView):
@@ -231,7 +563,8 @@ class CreateFailureExamView(CreateAPIView):
         },
         description=(
             "Create a review exam from previously failed questions. "
-            "Selects the most frequently failed questions from the specified period."
+            "Selects the most frequently failed questions from the specified period, "
+            "or of all time when start_date and end_date are omitted."
         ),
     )
     def post(self, request, *args, **kwargs):
@@ -252,31 +585,29 @@ class CreateFailureExamView(CreateAPIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        if len(failed_questions) > num_questions:
-            failed_questions = failed_questions[:num_questions]
-
         document = failed_questions[0].exam.document
 
-        exam = Exam.objects.create(
-            user=request.user,
-            document=document,
-            page_start=None,
-            page_end=None,
-            num_questions=len(failed_questions),
-        )
-
-        for question in failed_questions:
-            Question.objects.create(
-                exam=exam,
-                question=question.question,
-                options=question.options,
-                difficulty=question.difficulty,
+        # Enlaza las preguntas originales en vez de copiarlas: una fila
+        # pequeña por pregunta y las estadísticas siguen siendo de la misma
+        with transaction.atomic():
+            exam = Exam.objects.create(
+                user=request.user,
+                document=document,
+                page_start=None,
+                page_end=None,
+                num_questions=len(failed_questions),
+                is_review=True,
+                status=Exam.STATUS_DONE,
+                answer_key=Exam.build_answer_key(failed_questions),
             )
+            ExamQuestion.objects.bulk_create([
+                ExamQuestion(exam=exam, question=question, position=position)
+                for position, question in enumerate(failed_questions)
+            ])
 
         # Preparar respuesta consistente con ListExamView
-        created_questions = exam.questions.all()
         questions_response = []
-        for q in created_questions:
+        for q in failed_questions:
             questions_response.append({
                 "question": q.question,
                 "options": q.options,
@@ -289,39 +620,3 @@ class CreateFailureExamView(CreateAPIView):
         }
 
         return Response(response_data, status=status.HTTP_201_CREATED)
-
-
-def analyze_groq_costs(response):
-    """
-    Analiza costos y uso de tokens de una respuesta de Groq (ChatCompletion)
-    """
-
-    usage = response.usage
-    logger.info("\n🔹 USO DE TOKENS:")
-    logger.info(f"   Prompt Tokens:         {usage.prompt_tokens:,}")
-    logger.info(f"   Completion Tokens:     {usage.completion_tokens:,}")
-    logger.info(
-        f"   Reasoning Tokens:      {usage.completion_tokens_details.reasoning_tokens:,}"
-    )
-    print(f"   TOTAL TOKENS:          {usage.total_tokens:,}")
-
-    PRICE_INPUT_PER_1M = 0.075  # $0.14 por 1M input tokens
-    PRICE_OUTPUT_PER_1M = 0.30  # $0.55 por 1M output tokens
-
-    input_cost = (usage.prompt_tokens / 1_000_000) * PRICE_INPUT_PER_1M
-    output_cost = (usage.completion_tokens / 1_000_000) * PRICE_OUTPUT_PER_1M
-    total_cost = input_cost + output_cost
-
-    print(f"\n   Modelo: {response.model}")
-    print(f"   Precio Input:  ${PRICE_INPUT_PER_1M} por 1M tokens")
-    print(f"   Precio Output: ${PRICE_OUTPUT_PER_1M} por 1M tokens")
-    print(f"\n   💵 Costo Input:  ${input_cost:.6f} ({usage.prompt_tokens} tokens)")
-    print(f"   💵 Costo Output: ${output_cost:.6f} ({usage.completion_tokens} tokens)")
-    print(f"   💵 COSTO TOTAL:  ${total_cost:.6f}")
-
-    print("📊 RESUMEN EJECUTIVO")
-    print(f"   Este request costó:        ${total_cost:.6f}")
-    print(f"   Tiempo de respuesta:       {usage.total_time:.3f}s")
-    print(
-        f"   Velocidad:                 {usage.completion_tokens / usage.completion_time:.1f} tokens/s"
-    )
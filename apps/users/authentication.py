@@ -1,10 +1,12 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 import jwt
-from jwt import PyJWKClient
 from jwt.exceptions import InvalidTokenError
 from django.conf import settings
+from apps.users.jwks import get_jwks_store
 from apps.users.models import User
+from apps.users.token_cache import token_cache
+from apps.users.utils import get_user_by_clerk_id
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,18 +27,27 @@ class ClerkJWTAuthentication(BaseAuthentication):
 
         token = auth_header.split(" ")[1]
         logger.info(f"🔐 [AUTH] Token length: {len(token)} characters")
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        # Tokens repetidos se resuelven sin verificar firma ni consultar DB
+        cached = token_cache.get(token)
+        if cached is not None:
+            user, _ = cached
+            logger.info(f"✅ [AUTH] Token cache hit for user ID: {user.id}")
+            return (user, token)
 
         try:
             # Clerk uses RS256 algorithm with JWKS
             jwks_url = settings.CLERK_JWKS_URL
             logger.info(f"🔐 [AUTH] JWKS URL: {jwks_url}")
 
-            # Use PyJWKClient which handles JWKS key selection automatically
-            jwks_client = PyJWKClient(jwks_url, cache_keys=True)
+            # Llaves compartidas por proceso; solo se consulta el JWKS
+            # cuando vence el TTL o aparece un kid desconocido
+            jwks_store = get_jwks_store(jwks_url)
 
             logger.info("🔐 [AUTH] Getting signing key from JWKS...")
-            print(token)
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
+            signing_key = jwks_store.get_signing_key_from_jwt(token)
             logger.info(f"✅ [AUTH] Signing key obtained: {signing_key.key_id}")
 
             logger.info("🔐 [AUTH] Decoding token with signing key...")
@@ -63,9 +74,11 @@ class ClerkJWTAuthentication(BaseAuthentication):
 
             # Buscar o crear usuario en DB local
             logger.info(f"🔐 [AUTH] Looking up user with clerk_id: {clerk_user_id}")
-            user, created = User.objects.get_or_create(
-                clerk_id=clerk_user_id, defaults={"email": email}
-            )
+            user, created = get_user_by_clerk_id(clerk_user_id), False
+            if user is None:
+                user, created = User.objects.get_or_create(
+                    clerk_id=clerk_user_id, defaults={"email": email}
+                )
 
             if created:
                 logger.info(f"✅ [AUTH] New user created: {email} ({clerk_user_id})")
@@ -82,6 +95,8 @@ class ClerkJWTAuthentication(BaseAuthentication):
                 user.email = email
                 user.save(update_fields=["email", "updated_at"])
 
+            token_cache.set(token, payload)
+
             logger.info(f"✅ [AUTH] Authentication complete for user ID: {user.id}")
             return (user, token)
 
@@ -241,11 +256,10 @@ class SupabaseJWTAuthentication(BaseAuthentication):
         )
         logger.info(f"🔐 [AUTH] Expected audience: authenticated")
 
-        # Use PyJWKClient which handles JWKS key selection automatically
-        jwks_client = PyJWKClient(jwks_url, cache_keys=True)
+        jwks_store = get_jwks_store(jwks_url)
 
         logger.info("🔐 [AUTH] Getting signing key from JWKS...")
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        signing_key = jwks_store.get_signing_key(kid)
         logger.info(f"✅ [AUTH] Signing key obtained: {signing_key.key_id}")
 
         logger.info("🔐 [AUTH] Decoding token with signing key...")
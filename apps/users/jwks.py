@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from jwt import PyJWKClient
+from jwt.exceptions import PyJWKClientError
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    """
+    Almacén de llaves JWKS compartido por proceso, indexado por ``kid``.
+
+    - Las llaves se sirven desde memoria mientras no venza el TTL.
+    - Poco antes de vencer se refrescan en un hilo de fondo, sin bloquear
+      la petición que lo detecta.
+    - Un ``kid`` desconocido fuerza un refresco (limitado por
+      ``min_refresh_interval``); si sigue sin existir se guarda como
+      negativo durante ``negative_ttl`` para que tokens inválidos no
+      golpeen el endpoint JWKS.
+    - Si el endpoint falla se siguen usando las llaves vencidas.
+    """
+
+    MAX_NEGATIVE_ENTRIES = 1024
+
+    def __init__(
+        self,
+        jwks_url,
+        ttl=None,
+        refresh_ahead=None,
+        negative_ttl=None,
+        min_refresh_interval=None,
+        timeout=None,
+    ):
+        self.jwks_url = jwks_url
+        self.ttl = ttl if ttl is not None else settings.JWKS_CACHE_TTL
+        self.refresh_ahead = (
+            refresh_ahead if refresh_ahead is not None else settings.JWKS_REFRESH_AHEAD
+        )
+        self.negative_ttl = (
+            negative_ttl
+            if negative_ttl is not None
+            else settings.JWKS_NEGATIVE_CACHE_TTL
+        )
+        self.min_refresh_interval = (
+            min_refresh_interval
+            if min_refresh_interval is not None
+            else settings.JWKS_MIN_REFRESH_INTERVAL
+        )
+        self._client = PyJWKClient(
+            jwks_url,
+            cache_jwk_set=False,
+            timeout=timeout if timeout is not None else settings.JWKS_FETCH_TIMEOUT,
+        )
+
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt = None
+        self._negative = {}
+        self._refreshing = False
+        # _lock protege el estado; _fetch_lock garantiza un solo fetch a la vez
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def get_signing_key_from_jwt(self, token):
+        """Devuelve la llave (PyJWK) que firma ``token`` según su ``kid``."""
+        header = jwt.get_unverified_header(token)
+        return self.get_signing_key(header.get("kid"))
+
+    def get_signing_key(self, kid):
+        now = time.monotonic()
+
+        with self._lock:
+            key = self._keys.get(kid)
+            age = now - self._fetched_at if self._fetched_at is not None else None
+            negative_until = self._negative.get(kid)
+
+        if key is not None and age < self.ttl:
+            if age >= self.ttl - self.refresh_ahead:
+                self._refresh_in_background()
+            return key
+
+        if key is not None:
+            # TTL vencido: refrescamos en línea pero si el endpoint falla
+            # seguimos aceptando la llave que ya teníamos.
+            if not self._refresh(started_at=now):
+                logger.warning("⚠️  [JWKS] Refresh failed, serving stale key %s", kid)
+                return key
+            with self._lock:
+                key = self._keys.get(kid)
+            if key is not None:
+                return key
+            self._remember_missing(kid)
+            raise PyJWKClientError(
+                f'Unable to find a signing key that matches: "{kid}"'
+            )
+
+        if negative_until is not None and negative_until > now:
+            raise PyJWKClientError(
+                f'Unable to find a signing key that matches: "{kid}"'
+            )
+
+        # kid desconocido: refresco forzado, limitado en frecuencia
+        fetched = self._refresh(started_at=now, throttle=self._fetched_at is not None)
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            # Solo es negativo si un fetch posterior confirmó que no existe
+            if fetched:
+                self._remember_missing(kid)
+            raise PyJWKClientError(
+                f'Unable to find a signing key that matches: "{kid}"'
+            )
+        return key
+
+    def _refresh(self, started_at, throttle=False):
+        """
+        Descarga el JWKS. Si otro hilo ya lo descargó mientras esperábamos
+        el lock no se repite la petición. Retorna True si las llaves quedaron
+        frescas.
+        """
+        with self._fetch_lock:
+            with self._lock:
+                if self._fetched_at is not None and self._fetched_at >= started_at:
+                    return True
+                if (
+                    throttle
+                    and self._last_attempt is not None
+                    and time.monotonic() - self._last_attempt
+                    < self.min_refresh_interval
+                ):
+                    return False
+                self._last_attempt = time.monotonic()
+
+            try:
+                signing_keys = self._client.get_signing_keys(refresh=True)
+            except Exception as e:
+                logger.error(f"❌ [JWKS] Fetch of {self.jwks_url} failed: {e}")
+                return False
+
+            keys = {signing_key.key_id: signing_key for signing_key in signing_keys}
+            with self._lock:
+                self._keys = keys
+                self._fetched_at = time.monotonic()
+                self._negative = {
+                    kid: until
+                    for kid, until in self._negative.items()
+                    if kid not in keys
+                }
+            logger.info(
+                f"✅ [JWKS] Loaded {len(keys)} signing keys from {self.jwks_url}"
+            )
+            return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self._refresh(started_at=time.monotonic())
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    def _remember_missing(self, kid):
+        with self._lock:
+            if len(self._negative) >= self.MAX_NEGATIVE_ENTRIES:
+                now = time.monotonic()
+                self._negative = {
+                    k: until for k, until in self._negative.items() if until > now
+                }
+                if len(self._negative) >= self.MAX_NEGATIVE_ENTRIES:
+                    self._negative.pop(next(iter(self._negative)))
+            self._negative[kid] = time.monotonic() + self.negative_ttl
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_jwks_store(jwks_url):
+    """Devuelve el JWKSKeyStore del proceso para ``jwks_url``."""
+    store = _stores.get(jwks_url)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(jwks_url)
+            if store is None:
+                store = JWKSKeyStore(jwks_url)
+                _stores[jwks_url] = store
+    return store
+
+
+def _reset_stores():
+    # Tras un fork los locks pueden quedar tomados por hilos que no existen
+    global _stores_lock
+    _stores.clear()
+    _stores_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stores)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.models import User
+from apps.users.utils import user_cache
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    if instance.clerk_id:
+        user_cache.delete(instance.clerk_id)
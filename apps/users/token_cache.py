@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+
+from apps.users.utils import get_user_by_clerk_id
+from core.cache import LRUCache, get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedTokenCache:
+    """
+    Caché de bearer tokens ya verificados.
+
+    Guarda, por hash SHA-256 del token, los claims verificados hasta el
+    ``exp`` del token (acotado por ``max_ttl``). Primero se consulta un LRU
+    del proceso y después Redis, de modo que un hit no requiere criptografía.
+    El usuario se resuelve por ``sub`` con ``get_user_by_clerk_id``, cuya
+    caché se invalida al guardar o borrar el usuario. El token nunca se
+    guarda en claro.
+    """
+
+    def __init__(self, maxsize=None, max_ttl=None, prefix="auth:token"):
+        self.max_ttl = (
+            max_ttl if max_ttl is not None else settings.AUTH_TOKEN_CACHE_MAX_TTL
+        )
+        self.prefix = prefix
+        self._local = LRUCache(
+            maxsize=maxsize if maxsize is not None else settings.AUTH_TOKEN_CACHE_SIZE
+        )
+
+    def _key(self, token):
+        return f"{self.prefix}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+    def get(self, token):
+        """
+        Retorna ``(user, claims)`` si el token está en caché, no ha expirado
+        y su usuario todavía existe.
+        """
+        key = self._key(token)
+        entry = self._local.get(key)
+
+        if entry is None:
+            try:
+                raw = get_redis().get(key)
+            except Exception as e:
+                logger.warning(f"⚠️  [AUTH] Token cache unavailable: {e}")
+                raw = None
+            if raw is None:
+                return None
+            entry = json.loads(raw)
+
+        ttl = entry["claims"]["exp"] - time.time()
+        if ttl <= 0:
+            self._local.delete(key)
+            return None
+        self._local.set(key, entry, timeout=min(ttl, self.max_ttl))
+
+        user = get_user_by_clerk_id(entry["claims"]["sub"])
+        if user is None:
+            return None
+        return user, entry["claims"]
+
+    def set(self, token, claims):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        ttl = min(exp - time.time(), self.max_ttl)
+        if ttl <= 0:
+            return
+
+        key = self._key(token)
+        entry = {"claims": claims}
+        self._local.set(key, entry, timeout=ttl)
+        try:
+            get_redis().set(key, json.dumps(entry), ex=max(int(ttl), 1))
+        except Exception as e:
+            logger.warning(f"⚠️  [AUTH] Token cache unavailable: {e}")
+
+
+token_cache = VerifiedTokenCache()
@@ -0,0 +1,25 @@
+from apps.users.models import User
+from core.cache import TwoTierCache
+
+# v2: se guardan todos los campos concretos, no solo id/clerk_id/email
+user_cache = TwoTierCache("user_by_clerk_id", version=2)
+
+USER_CACHED_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+def get_user_by_clerk_id(clerk_id):
+    """
+    Retorna el usuario con ese clerk_id o None si no existe. La entrada se
+    invalida en cada ``post_save``/``post_delete`` del usuario.
+    """
+    data = user_cache.get_or_set(
+        clerk_id,
+        lambda: User.objects.filter(clerk_id=clerk_id)
+        .values(*USER_CACHED_FIELDS)
+        .first(),
+    )
+    if data is None:
+        return None
+    return User.from_db(
+        "default", USER_CACHED_FIELDS, [data[field] for field in USER_CACHED_FIELDS]
+    )
@@ -10,14 +10,24 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ProtocolTypeRouter, URLRouter
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 django_asgi_app = get_asgi_application()
 
+# Importado después de inicializar Django: usa modelos y settings
+from django.conf import settings  # noqa: E402
+from core.websocket import (  # noqa: E402
+    WebSocketOriginValidator,
+    websocket_urlpatterns,
+)
+
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
+        "websocket": WebSocketOriginValidator(
+            URLRouter(websocket_urlpatterns), settings.CHANNELS_ALLOWED_ORIGINS
+        ),
     }
 )
@@ -0,0 +1,379 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Cliente Redis compartido por proceso (el pool de redis-py ya detecta
+    forks y reabre sus conexiones).
+    """
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=False,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    retry_on_timeout=True,
+                )
+    return _redis_client
+
+
+class LRUCache:
+    """
+    Caché en memoria del proceso, acotada por número de entradas (LRU) y con
+    expiración por entrada. Segura para usar desde varios hilos.
+    """
+
+    def __init__(self, maxsize=1024, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache:
+    """
+    Caché de dos niveles para lecturas calientes.
+
+    - L1: ``LRUCache`` del proceso con un TTL corto.
+    - L2: la caché ``default`` de Django (Redis vía django-redis).
+
+    Las llaves llevan el nombre y la versión de la caché (subir ``version``
+    al cambiar la forma de los valores) y una generación: la del grupo si se
+    pasa ``group`` o, si no, una propia de la llave. ``invalidate_group`` y
+    ``delete`` incrementan esa generación y dejan huérfanos los valores
+    anteriores, incluso los que un loader lento escriba después.
+
+    Las llaves de generación expiran (el doble del TTL de los valores) y
+    cada escritura renueva la suya: solo desaparecen cuando ya no queda
+    ningún valor bajo su generación, así reiniciarlas en 0 no revive nada.
+
+    Los borrados se publican por Redis pub/sub para que el resto de procesos
+    descarte su L1. Los valores deben ser datos planos (dicts, listas,
+    strings): L1 comparte la misma instancia entre hilos.
+    """
+
+    def __init__(
+        self, name, version=1, timeout=None, local_maxsize=None, local_timeout=None
+    ):
+        self.name = name
+        self.version = version
+        self.timeout = (
+            timeout if timeout is not None else settings.CACHE_DEFAULT_TIMEOUT
+        )
+        self._local = LRUCache(
+            maxsize=(
+                local_maxsize
+                if local_maxsize is not None
+                else settings.CACHE_LOCAL_MAXSIZE
+            ),
+            timeout=(
+                local_timeout
+                if local_timeout is not None
+                else settings.CACHE_LOCAL_TIMEOUT
+            ),
+        )
+        self._stats = CacheStats(name)
+        # Cuenta los desalojos de L1 (locales o recibidos por pub/sub)
+        self._evictions = 0
+        _registry[name] = self
+
+    @property
+    def _backend(self):
+        from django.core.cache import cache
+
+        return cache
+
+    def _local_key(self, key, group):
+        return f"{group}:{key}" if group is not None else str(key)
+
+    def _generation_key(self, group):
+        return f"{self.name}:v{self.version}:gen:{group}"
+
+    def _key_generation_key(self, key):
+        return f"{self.name}:v{self.version}:kgen:{key}"
+
+    def _generation_key_for(self, key, group):
+        if group is None:
+            return self._key_generation_key(key)
+        return self._generation_key(group)
+
+    def _remote_key(self, key, group):
+        generation = self._backend.get(self._generation_key_for(key, group), 0)
+        if group is None:
+            return f"{self.name}:v{self.version}:k{generation}:{key}"
+        return f"{self.name}:v{self.version}:{group}:g{generation}:{key}"
+
+    def _generation_timeout(self, timeout=None):
+        # Más largo que cualquier valor guardado bajo la generación
+        return 2 * max(self.timeout, timeout or 0)
+
+    def _bump(self, generation_key):
+        timeout = self._generation_timeout()
+        self._backend.add(generation_key, 0, timeout=timeout)
+        try:
+            self._backend.incr(generation_key)
+        except ValueError:
+            self._backend.set(generation_key, 1, timeout=timeout)
+        self._backend.touch(generation_key, timeout)
+
+    def _store(self, remote_key, value, key, group, timeout):
+        self._backend.set(remote_key, value, timeout=timeout)
+        # No-op si la generación sigue en 0 (la llave todavía no existe)
+        self._backend.touch(
+            self._generation_key_for(key, group), self._generation_timeout(timeout)
+        )
+
+    def get(self, key, group=None, default=None):
+        ensure_invalidation_listener()
+        local_key = self._local_key(key, group)
+
+        value = self._local.get(local_key, _MISSING)
+        if value is not _MISSING:
+            self._stats.record("l1_hits")
+            return value
+
+        value = self._backend.get(self._remote_key(key, group), _MISSING)
+        if value is not _MISSING:
+            self._stats.record("l2_hits")
+            self._local.set(local_key, value)
+            return value
+
+        self._stats.record("misses")
+        return default
+
+    def set(self, key, value, group=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        self._local.set(self._local_key(key, group), value)
+        self._store(self._remote_key(key, group), value, key, group, timeout)
+        self._stats.record("sets")
+
+    def get_or_set(self, key, loader, group=None, timeout=None, refresh=False):
+        """
+        Retorna el valor en caché o lo calcula con ``loader()``. Un ``None``
+        devuelto por el loader no se guarda. Con ``refresh`` siempre se
+        recalcula y se reemplaza lo guardado.
+
+        La generación (del grupo o de la llave) se lee una sola vez, antes
+        del loader: si se invalida mientras corre, el valor queda bajo la
+        generación vieja y Redis no lo vuelve a servir. Tampoco se guarda en
+        L1 si hubo desalojos locales en ese lapso.
+        """
+        ensure_invalidation_listener()
+        local_key = self._local_key(key, group)
+        evictions = self._evictions
+        if not refresh:
+            value = self._local.get(local_key, _MISSING)
+            if value is not _MISSING:
+                self._stats.record("l1_hits")
+                return value
+
+        remote_key = self._remote_key(key, group)
+        if not refresh:
+            value = self._backend.get(remote_key, _MISSING)
+            if value is not _MISSING:
+                self._stats.record("l2_hits")
+                self._local.set(local_key, value)
+                return value
+            self._stats.record("misses")
+
+        value = loader()
+        if value is not None:
+            timeout = self.timeout if timeout is None else timeout
+            if self._evictions == evictions:
+                self._local.set(local_key, value)
+            self._store(remote_key, value, key, group, timeout)
+            self._stats.record("sets")
+        return value
+
+    def delete(self, key, group=None):
+        self._backend.delete(self._remote_key(key, group))
+        if group is None:
+            self._bump(self._key_generation_key(key))
+        self._evict(self._local_key(key, group))
+        publish_invalidation(self.name, key=self._local_key(key, group))
+        self._stats.record("invalidations")
+
+    def invalidate_group(self, group):
+        self._bump(self._generation_key(group))
+        self._evict_group(str(group))
+        publish_invalidation(self.name, group=str(group))
+        self._stats.record("invalidations")
+
+    def _evict(self, local_key):
+        self._evictions += 1
+        self._local.delete(local_key)
+
+    def _evict_all(self):
+        self._evictions += 1
+        self._local.clear()
+
+    def _evict_group(self, group):
+        self._evictions += 1
+        prefix = f"{group}:"
+        for local_key in self._local.keys():
+            if local_key.startswith(prefix):
+                self._local.delete(local_key)
+
+    def stats(self):
+        return self._stats.snapshot()
+
+
+class CacheStats:
+    """
+    Contadores de hits/misses por caché. Se acumulan en memoria y se vuelcan
+    cada ``CACHE_STATS_FLUSH_INTERVAL`` segundos a un hash de Redis, para poder
+    leer los totales de todos los procesos con ``manage.py cache_stats``.
+    """
+
+    FIELDS = ("l1_hits", "l2_hits", "misses", "sets", "invalidations")
+
+    def __init__(self, name):
+        self.name = name
+        self._pending = dict.fromkeys(self.FIELDS, 0)
+        self._totals = dict.fromkeys(self.FIELDS, 0)
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def redis_key(name):
+        return f"cache:stats:{name}"
+
+    def record(self, field):
+        with self._lock:
+            self._pending[field] += 1
+            self._totals[field] += 1
+            if (
+                time.monotonic() - self._flushed_at
+                < settings.CACHE_STATS_FLUSH_INTERVAL
+            ):
+                return
+            pending = self._pending
+            self._pending = dict.fromkeys(self.FIELDS, 0)
+            self._flushed_at = time.monotonic()
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for name, count in pending.items():
+                if count:
+                    pipe.hincrby(self.redis_key(self.name), name, count)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️  [CACHE] Could not flush stats for {self.name}: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._totals)
+
+
+_MISSING = object()
+_registry = {}
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def publish_invalidation(name, key=None, group=None):
+    try:
+        get_redis().publish(
+            INVALIDATION_CHANNEL,
+            json.dumps({"cache": name, "key": key, "group": group}),
+        )
+    except Exception as e:
+        logger.warning(f"⚠️  [CACHE] Could not publish invalidation for {name}: {e}")
+
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def ensure_invalidation_listener():
+    """
+    Arranca (una vez por proceso, también después de un fork) el hilo que
+    escucha las invalidaciones publicadas por otros procesos.
+    """
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        for cache in _registry.values():
+            cache._evict_all()
+        threading.Thread(
+            target=_listen_for_invalidations, name="cache-invalidation", daemon=True
+        ).start()
+
+
+def _listen_for_invalidations():
+    while True:
+        try:
+            # Conexión propia sin socket_timeout: listen() bloquea indefinidamente
+            client = redis.Redis.from_url(settings.REDIS_URL, health_check_interval=30)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            for message in pubsub.listen():
+                data = json.loads(message["data"])
+                cache = _registry.get(data.get("cache"))
+                if cache is None:
+                    continue
+                if data.get("group") is not None:
+                    cache._evict_group(data["group"])
+                elif data.get("key") is not None:
+                    cache._evict(data["key"])
+        except Exception as e:
+            logger.warning(f"⚠️  [CACHE] Invalidation listener disconnected: {e}")
+        # Mientras estuvimos desconectados pudimos perder mensajes
+        for cache in _registry.values():
+            cache._evict_all()
+        time.sleep(1)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import CacheStats, get_redis
+
+
+class Command(BaseCommand):
+    help = "Muestra hits/misses acumulados de las cachés de dos niveles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Borra los contadores tras mostrarlos"
+        )
+
+    def handle(self, *args, **options):
+        client = get_redis()
+        prefix = CacheStats.redis_key("")
+        keys = sorted(client.scan_iter(match=f"{prefix}*"))
+        if not keys:
+            self.stdout.write("No cache stats recorded yet.")
+            return
+
+        for key in keys:
+            name = key.decode()[len(prefix) :]
+            counts = {k.decode(): int(v) for k, v in client.hgetall(key).items()}
+            l1 = counts.get("l1_hits", 0)
+            l2 = counts.get("l2_hits", 0)
+            misses = counts.get("misses", 0)
+            lookups = l1 + l2 + misses
+            hit_rate = (l1 + l2) / lookups * 100 if lookups else 0
+            self.stdout.write(
+                f"{name}: lookups={lookups} l1_hits={l1} l2_hits={l2} "
+                f"misses={misses} sets={counts.get('sets', 0)} "
+                f"invalidations={counts.get('invalidations', 0)} "
+                f"hit_rate={hit_rate:.1f}%"
+            )
+
+        if options["reset"]:
+            client.delete(*keys)
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from huey.contrib.djhuey import HUEY
+from huey.storage import RedisStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la cola con prioridad las tareas (encoladas y programadas) "
+        "que quedaron en la lista de RedisHuey bajo HUEY_LEGACY_QUEUE"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Sigue moviendo tareas cada --interval segundos hasta interrumpirlo",
+        )
+        parser.add_argument("--interval", type=float, default=5)
+
+    def handle(self, *args, **options):
+        legacy = RedisStorage(
+            settings.HUEY_LEGACY_QUEUE,
+            blocking=False,
+            connection_pool=HUEY.storage.pool,
+        )
+        while True:
+            queued, scheduled = self.drain(legacy)
+            if queued or scheduled or not options["follow"]:
+                self.stdout.write(
+                    f"Moved {queued} queued and {scheduled} scheduled tasks "
+                    f"from {legacy.queue_key}."
+                )
+            if not options["follow"]:
+                return
+            time.sleep(options["interval"])
+
+    def drain(self, legacy):
+        # RPOP de a una tarea: la más antigua primero, y nada se pierde si
+        # dos procesos drenan a la vez
+        queued = 0
+        while True:
+            data = legacy.dequeue()
+            if data is None:
+                break
+            message = HUEY.serializer.deserialize(data)
+            HUEY.storage.enqueue(data, message.priority)
+            queued += 1
+
+        # Mismo formato en ambas: sorted set con el timestamp de ejecución
+        scheduled = 0
+        while True:
+            items = legacy.conn.zpopmin(legacy.schedule_key, count=100)
+            if not items:
+                break
+            HUEY.storage.conn.zadd(HUEY.storage.schedule_key, dict(items))
+            scheduled += len(items)
+        return queued, scheduled
@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre una llave estable (p. ej. ``created_at``,
+    ``id``): cada página filtra ``WHERE (created_at, id) < (...)`` y lee
+    ``page_size + 1`` filas, sin ``COUNT(*)`` ni ``OFFSET``. El costo por
+    página no depende de cuántas filas tenga el usuario, siempre que exista
+    un índice con la misma llave.
+
+    La vista define el orden con el atributo ``ordering``; el último campo
+    debe ser único (normalmente ``id``) para que no haya empates.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, "ordering", None) or self.ordering)
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            values = self.to_python(queryset.model, position)
+            queryset = queryset.filter(_after(ordering, values))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.first = self._position(results[0]) if results else position
+        self.last = self._position(results[-1]) if results else position
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def _position(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return values
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({"p": position, "r": int(reverse)}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = payload["p"], bool(payload["r"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, model, position):
+        """
+        Convierte cada valor del cursor con el campo del modelo, para que un
+        cursor manipulado responda 404 y no un error de la base de datos.
+        """
+        fields = [model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor taken from next/previous",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Results per page (max {self.max_page_size})",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+def _invert(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _after(ordering, position):
+    """
+    Filtro de las filas que van después de ``position`` en ``ordering``:
+    ``a > x OR (a = x AND b > y) OR ...`` con el sentido de cada campo.
+    """
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {ordering[i].lstrip("-"): position[i] for i in range(index)}
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+    return reduce(or_, clauses)
@@ -0,0 +1,142 @@
+"""
+Caché HTTP por usuario para endpoints de lectura (listados y detalles).
+
+Las respuestas se guardan por usuario, ruta y query string en un grupo de
+``TwoTierCache`` cuya generación sube con cada escritura relevante del
+usuario (``invalidate_user_responses``), así una entrada vieja nunca se
+vuelve a servir. Cada respuesta lleva ETag y Last-Modified; con
+If-None-Match / If-Modified-Since vigentes se responde 304, y con
+``Cache-Control: no-cache`` se recalcula la respuesta.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import TwoTierCache, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Sin L1: la generación del usuario se consulta en Redis en cada lectura
+response_cache = TwoTierCache(
+    "response", timeout=settings.RESPONSE_CACHE_TIMEOUT, local_maxsize=0
+)
+
+
+def _last_modified_key(user_id):
+    return f"response:last_modified:{user_id}"
+
+
+# Atómico en Redis: Last-Modified estrictamente creciente (HTTP-date tiene
+# resolución de segundos), así dos escrituras en el mismo segundo, aunque
+# vengan de procesos distintos, no se confunden. La hora es la del servidor.
+BUMP_LAST_MODIFIED_SCRIPT = """
+local now = redis.call('TIME')
+local value = tonumber(now[1])
+if tonumber(now[2]) > 0 then
+    value = value + 1
+end
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+if previous >= value then
+    value = previous + 1
+end
+redis.call('SET', KEYS[1], value)
+return value
+"""
+
+
+def invalidate_user_responses(user_id):
+    """
+    Descarta las respuestas cacheadas del usuario. Dentro de una transacción
+    se aplica al hacer commit, cuando la escritura ya es visible.
+    """
+    if user_id is None:
+        return
+
+    def invalidate():
+        response_cache.invalidate_group(user_id)
+        try:
+            get_redis().eval(BUMP_LAST_MODIFIED_SCRIPT, 1, _last_modified_key(user_id))
+        except Exception as e:
+            logger.warning(f"⚠️  [CACHE] Could not bump Last-Modified: {e}")
+
+    transaction.on_commit(invalidate)
+
+
+def _last_modified(user_id):
+    try:
+        value = get_redis().get(_last_modified_key(user_id))
+    except Exception as e:
+        logger.warning(f"⚠️  [CACHE] Could not read Last-Modified: {e}")
+        value = None
+    return int(value) if value else int(time.time())
+
+
+class CachedResponseMixin:
+    """
+    Sirve ``list`` y ``retrieve`` desde ``response_cache``. Solo se guardan
+    respuestas 200 de usuarios autenticados; las vistas deben invalidar con
+    ``invalidate_user_responses`` en cada escritura que cambie sus datos.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        rendered = {}
+
+        def load():
+            last_modified = _last_modified(request.user.id)
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                rendered["response"] = response
+                return None
+            body = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+            return {
+                "data": json.loads(body),
+                "etag": hashlib.sha1(body.encode()).hexdigest(),
+                "last_modified": last_modified,
+            }
+
+        key = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+        no_cache = "no-cache" in request.headers.get("Cache-Control", "")
+        entry = response_cache.get_or_set(
+            key, load, group=request.user.id, refresh=no_cache
+        )
+        if entry is None:
+            return rendered["response"]
+
+        etag = quote_etag(entry["etag"])
+        if self.not_modified(request, etag, entry["last_modified"]):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry["data"])
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        # Cada cliente revalida con el ETag; nunca en cachés compartidas
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in parse_etags(if_none_match)
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return if_modified_since is not None and last_modified <= if_modified_since
@@ -14,7 +14,7 @@ from pathlib import Path
 import os
 import environ
 from redis import ConnectionPool
-from huey import RedisHuey
+from huey import PriorityRedisHuey
 import sentry_sdk
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,10 +56,12 @@ DJANGO_APPS = [
 ]
 
 PROJECT_APPS = [
+    "core",
     "apps.documents",
     "apps.docs",
     "apps.users",
     "apps.exams",
+    "apps.analytics",
 ]
 
 THIRD_PARTY_APPS = [
@@ -68,6 +70,7 @@ THIRD_PARTY_APPS = [
     "django_filters",
     "corsheaders",
     "huey.contrib.djhuey",
+    "channels",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + PROJECT_APPS + THIRD_PARTY_APPS
@@ -186,17 +189,57 @@ REST_FRAMEWORK = {
 
 
 CHANNELS_ALLOWED_ORIGINS = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
+    *CORS_ALLOWED_ORIGINS,
+    "https://.vercel.app",
 ]
+# Segundos que tiene un socket recién abierto para enviar {"event": "auth"}
+WEBSOCKET_AUTH_TIMEOUT = env.int("WEBSOCKET_AUTH_TIMEOUT", default=10)
+
+REDIS_URL = env("REDIS_URL")
+REDIS_SOCKET_TIMEOUT = 5
 
 pool = ConnectionPool.from_url(
-    env("REDIS_URL"),
+    REDIS_URL,
     decode_responses=False,
-    socket_timeout=5,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
     retry_on_timeout=True,
 )
-HUEY = RedisHuey("tutorcito_prod", connection_pool=pool)
+# Priority queue: background work (question bank) runs after user-facing tasks.
+# PriorityRedisHuey keeps the queue in a sorted set, so it cannot reuse the
+# list RedisHuey used under HUEY_LEGACY_QUEUE (WRONGTYPE). The Procfile's
+# legacy_queue process (manage.py drain_legacy_huey_queue --follow) moves the
+# tasks still queued or scheduled there into this queue; remove it once
+# "huey.redis.tutorcitoprod" and "huey.schedule.tutorcitoprod" are gone.
+HUEY_LEGACY_QUEUE = "tutorcito_prod"
+HUEY = PriorityRedisHuey("tutorcito_prod_priority", connection_pool=pool)
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [REDIS_URL]},
+    }
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "tutorcito",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+            "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+            # Si Redis cae, la caché se comporta como un miss
+            "IGNORE_EXCEPTIONS": True,
+        },
+    }
+}
+
+# Two-tier object cache (core.cache.TwoTierCache)
+CACHE_DEFAULT_TIMEOUT = env.int("CACHE_DEFAULT_TIMEOUT", default=60 * 15)
+CACHE_LOCAL_MAXSIZE = env.int("CACHE_LOCAL_MAXSIZE", default=512)
+CACHE_LOCAL_TIMEOUT = env.int("CACHE_LOCAL_TIMEOUT", default=30)
+CACHE_STATS_FLUSH_INTERVAL = env.int("CACHE_STATS_FLUSH_INTERVAL", default=30)
 
 
 # Clerk Configuration
@@ -204,6 +247,17 @@ CLERK_SECRET_KEY = env("CLERK_SECRET_KEY", default="")
 CLERK_PUBLISHABLE_KEY = env("CLERK_PUBLISHABLE_KEY", default="")
 CLERK_JWKS_URL = env("CLERK_JWKS_URL", default="")
 
+# JWKS key cache (seconds)
+JWKS_CACHE_TTL = env.int("JWKS_CACHE_TTL", default=3600)
+JWKS_REFRESH_AHEAD = env.int("JWKS_REFRESH_AHEAD", default=300)
+JWKS_NEGATIVE_CACHE_TTL = env.int("JWKS_NEGATIVE_CACHE_TTL", default=300)
+JWKS_MIN_REFRESH_INTERVAL = env.int("JWKS_MIN_REFRESH_INTERVAL", default=30)
+JWKS_FETCH_TIMEOUT = env.int("JWKS_FETCH_TIMEOUT", default=5)
+
+# Verified bearer token cache
+AUTH_TOKEN_CACHE_SIZE = env.int("AUTH_TOKEN_CACHE_SIZE", default=10000)
+AUTH_TOKEN_CACHE_MAX_TTL = env.int("AUTH_TOKEN_CACHE_MAX_TTL", default=300)
+
 # Cloudflare R2 Configuration
 R2_ACCOUNT_ID = env("R2_ACCOUNT_ID", default="")
 R2_ACCESS_KEY_ID = env("R2_ACCESS_KEY_ID", default="")
@@ -212,12 +266,83 @@ R2_BUCKET_NAME = env("R2_BUCKET_NAME", default="pdfs")
 R2_PUBLIC_URL = env(
     "R2_PUBLIC_URL", default=""
 )  # Optional: Custom domain or R2.dev URL
+# Optional: point the S3 client at a local stand-in (MinIO, moto) instead of R2
+R2_ENDPOINT_URL = env("R2_ENDPOINT_URL", default="")
+R2_PRESIGNED_URL_EXPIRES = env.int("R2_PRESIGNED_URL_EXPIRES", default=60 * 60)
+R2_MAX_POOL_CONNECTIONS = env.int("R2_MAX_POOL_CONNECTIONS", default=20)
+R2_CONNECT_TIMEOUT = env.int("R2_CONNECT_TIMEOUT", default=5)
+R2_READ_TIMEOUT = env.int("R2_READ_TIMEOUT", default=60)
+R2_MAX_ATTEMPTS = env.int("R2_MAX_ATTEMPTS", default=3)
+R2_MULTIPART_THRESHOLD = env.int("R2_MULTIPART_THRESHOLD", default=8 * 1024 * 1024)
+R2_MULTIPART_CHUNKSIZE = env.int("R2_MULTIPART_CHUNKSIZE", default=8 * 1024 * 1024)
+R2_MULTIPART_CONCURRENCY = env.int("R2_MULTIPART_CONCURRENCY", default=4)
+
+# Uploads always go to a temp file on disk, never to memory
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# PDF text extraction (process pool shared by the Huey worker threads)
+PDF_EXTRACTION_WORKERS = env.int(
+    "PDF_EXTRACTION_WORKERS", default=min(4, os.cpu_count() or 1)
+)
+PDF_EXTRACTION_CHUNK_SIZE = env.int("PDF_EXTRACTION_CHUNK_SIZE", default=10)
+PDF_EXTRACTION_START_METHOD = env("PDF_EXTRACTION_START_METHOD", default="spawn")
 
 # OpenAI Configuration
 OPENAI_API_KEY = env("OPENAI_API_KEY", default="")
+OPENAI_MODEL = env("OPENAI_MODEL", default="gpt-5-mini")
 
 # Groq Configuration
 GROQ_API_KEY = env("GROQ_API_KEY", default="")
+GROQ_MODEL = env("GROQ_MODEL", default="openai/gpt-oss-20b")
+
+# Question generation provider: groq | openai | fake (offline, for load tests)
+LLM_PROVIDER = env("LLM_PROVIDER", default="groq")
+FAKE_LLM_LATENCY = env.float("FAKE_LLM_LATENCY", default=1.0)
+# USD per 1M tokens (input, output), used for LLMUsage.cost_usd
+LLM_PRICES = {
+    "openai/gpt-oss-20b": (0.075, 0.30),
+    "gpt-5-mini": (0.25, 2.00),
+}
+
+# Question bank pre-generated after PDF extraction (opt-in: it spends tokens
+# on every uploaded document). Windows of QUESTION_BANK_WINDOW pages get
+# QUESTION_BANK_PER_WINDOW questions each, enqueued with a low Huey priority.
+QUESTION_BANK_ENABLED = env.bool("QUESTION_BANK_ENABLED", default=False)
+QUESTION_BANK_WINDOW = env.int("QUESTION_BANK_WINDOW", default=2)
+QUESTION_BANK_PER_WINDOW = env.int("QUESTION_BANK_PER_WINDOW", default=6)
+QUESTION_BANK_PRIORITY = env.int("QUESTION_BANK_PRIORITY", default=-10)
+# Per-window lock (seconds); must outlast one window's generation
+QUESTION_BANK_LOCK_TIMEOUT = env.int("QUESTION_BANK_LOCK_TIMEOUT", default=60 * 10)
+
+# LLM client pool and concurrency limits (apps.exams.llm)
+LLM_REQUEST_TIMEOUT = env.int("LLM_REQUEST_TIMEOUT", default=60)
+LLM_MAX_RETRIES = env.int("LLM_MAX_RETRIES", default=2)
+LLM_MAX_CONNECTIONS = env.int("LLM_MAX_CONNECTIONS", default=20)
+LLM_MAX_CONCURRENCY = env.int("LLM_MAX_CONCURRENCY", default=8)
+LLM_GLOBAL_MAX_CONCURRENCY = env.int("LLM_GLOBAL_MAX_CONCURRENCY", default=32)
+LLM_MAX_QUEUE = env.int("LLM_MAX_QUEUE", default=32)
+LLM_ACQUIRE_TIMEOUT = env.int("LLM_ACQUIRE_TIMEOUT", default=10)
+
+# Cache of generated questions, keyed by context + num_questions + model + prompt
+GENERATION_CACHE_TIMEOUT = env.int("GENERATION_CACHE_TIMEOUT", default=60 * 60 * 24 * 7)
+GENERATION_CACHE_LOCAL_MAXSIZE = env.int("GENERATION_CACHE_LOCAL_MAXSIZE", default=64)
+
+# Fan-out: exams larger than GENERATION_BATCH_SIZE are generated in concurrent
+# batches, merged and deduplicated (difflib ratio >= GENERATION_DEDUP_THRESHOLD)
+GENERATION_BATCH_SIZE = env.int("GENERATION_BATCH_SIZE", default=5)
+GENERATION_MAX_CONCURRENCY = env.int("GENERATION_MAX_CONCURRENCY", default=4)
+GENERATION_DEDUP_THRESHOLD = env.float("GENERATION_DEDUP_THRESHOLD", default=0.85)
+# Upper bound for num_questions on exam creation (bounds the batch fan-out)
+GENERATION_MAX_QUESTIONS = env.int("GENERATION_MAX_QUESTIONS", default=50)
+
+# Per-user HTTP response cache for list/detail endpoints (core.response_cache)
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=60 * 10)
+
+# Learning analytics (apps.analytics): cached per user, invalidated on each attempt
+ANALYTICS_CACHE_TIMEOUT = env.int("ANALYTICS_CACHE_TIMEOUT", default=60 * 60)
+ANALYTICS_MAX_DAYS = env.int("ANALYTICS_MAX_DAYS", default=365)
 
 LOGGING = {
     "version": 1,
@@ -20,7 +20,11 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from apps.documents.viewsets import DocumentViewSet
-from apps.documents.views import DocumentUploadView
+from apps.documents.views import (
+    DocumentUploadView,
+    DocumentPresignUploadView,
+    DocumentFinalizeUploadView,
+)
 from apps.users.viewsets import UserViewSet
 from apps.users.views import get_current_user
 from django.conf.urls.static import static
@@ -42,11 +46,22 @@ urlpatterns = [
     path("", include("apps.docs.urls")),
     path("api/auth/me/", get_current_user, name="current-user"),
     path("api/", include("apps.exams.urls")),
+    path("api/", include("apps.analytics.urls")),
     path(
         "api/documents/upload/",
         DocumentUploadView.as_view(),
         name="document-upload",
     ),
+    path(
+        "api/documents/upload/presign/",
+        DocumentPresignUploadView.as_view(),
+        name="document-upload-presign",
+    ),
+    path(
+        "api/documents/upload/finalize/",
+        DocumentFinalizeUploadView.as_view(),
+        name="document-upload-finalize",
+    ),
     path("test/", test),
     path("api/", include(router.urls)),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from channels.security.websocket import OriginValidator
+from django.conf import settings
+from django.urls import path
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+def notify_user(user_id, event, data):
+    """
+    Envía un evento a todos los sockets abiertos del usuario. Se llama desde
+    código síncrono (vistas, tareas de Huey); si el channel layer falla solo
+    se registra, nunca interrumpe a quien notifica.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            user_group(user_id),
+            {"type": "status.event", "event": event, "data": data},
+        )
+    except Exception as e:
+        logger.warning(f"⚠️  [WS] Could not notify user {user_id} ({event}): {e}")
+
+
+@database_sync_to_async
+def authenticate_token(token):
+    """Usuario dueño del JWT de Clerk, o None si el token no es válido."""
+    from apps.users.authentication import ClerkJWTAuthentication
+
+    try:
+        user, _ = ClerkJWTAuthentication().authenticate_credentials(token)
+        return user
+    except AuthenticationFailed:
+        return None
+
+
+class WebSocketOriginValidator(OriginValidator):
+    """
+    Valida el Origin de navegadores contra la lista permitida y deja pasar
+    clientes nativos que no envían Origin (la autenticación es por token, no
+    por cookies).
+    """
+
+    def valid_origin(self, parsed_origin):
+        if parsed_origin is None:
+            return True
+        return super().valid_origin(parsed_origin)
+
+
+class StatusConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Canal por usuario con el avance de sus documentos y exámenes. Los
+    mensajes tienen la forma ``{"event": "...", "data": {...}}``.
+
+    El JWT no viaja en la URL (quedaría en logs de proxies y del servidor):
+    el primer mensaje debe ser ``{"event": "auth", "token": "..."}``. Si no
+    llega en ``WEBSOCKET_AUTH_TIMEOUT`` segundos o el token no es válido, el
+    socket se cierra con 4401.
+    """
+
+    group_name = None
+
+    async def connect(self):
+        await self.accept()
+        self.auth_deadline = asyncio.create_task(self.close_if_unauthenticated())
+
+    async def close_if_unauthenticated(self):
+        await asyncio.sleep(settings.WEBSOCKET_AUTH_TIMEOUT)
+        if self.group_name is None:
+            await self.close(code=4401)
+
+    async def authenticate(self, content):
+        token = content.get("token") if content.get("event") == "auth" else None
+        user = await authenticate_token(token) if isinstance(token, str) else None
+        if user is None:
+            await self.close(code=4401)
+            return
+        self.auth_deadline.cancel()
+        self.scope["user"] = user
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send_json({"event": "authenticated"})
+
+    async def disconnect(self, code):
+        if hasattr(self, "auth_deadline"):
+            self.auth_deadline.cancel()
+        if self.group_name is not None:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if not isinstance(content, dict):
+            return
+        if self.group_name is None:
+            await self.authenticate(content)
+        # El canal es solo de salida; respondemos pings para mantenerlo vivo
+        elif content.get("event") == "ping":
+            await self.send_json({"event": "pong"})
+
+    async def status_event(self, message):
+        await self.send_json({"event": message["event"], "data": message["data"]})
+
+
+websocket_urlpatterns = [
+    path("ws/status/", StatusConsumer.as_asgi()),
+]